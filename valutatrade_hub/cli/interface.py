@@ -1,6 +1,8 @@
+import asyncio
 from argparse import ArgumentParser
 from datetime import datetime
 from functools import wraps
+from pathlib import Path
 from shlex import split as shlex_split
 
 from prompt import string as prompt_string
@@ -20,11 +22,14 @@ from valutatrade_hub.core.usecases import (
     show_portfolio,
 )
 from valutatrade_hub.core.utils import load_json
+from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.infra.sharded_backend import ShardedStorageBackend
 from valutatrade_hub.parser_service.api_clients import (
     CoinGeckoClient,
     ExchangeRateApiClient,
 )
 from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.history import convert_json_history
 from valutatrade_hub.parser_service.storage import ExchangeRatesStorage
 from valutatrade_hub.parser_service.updater import RatesUpdater
 
@@ -165,11 +170,13 @@ def check_login(login_id):
     return True
 
 
-def handle_update_rates(source_filter: str | None = None):
+def handle_update_rates(source_filter: str | None = None, use_async: bool = False):
     """Обрабатывает команду обновления курсов валют.
 
     Args:
         source_filter (str | None): Фильтр по источнику (coingecko/exchangerate).
+        use_async (bool): Опрашивать источники в цикле событий
+            (RatesUpdater.run_update_async) вместо пула потоков.
     """
     try:
         config = ParserConfig()
@@ -189,14 +196,27 @@ def handle_update_rates(source_filter: str | None = None):
             print("Доступные источники: coingecko, exchangerate")
             return
 
-        rates_path = config.RATES_FILE_PATH or "data/rates.json"
-        history_path = config.HISTORY_FILE_PATH or "data/exchange_rates.json"
-
-        storage = ExchangeRatesStorage(history_path, rates_path)
-        updater = RatesUpdater(clients, storage)
+        storage = ExchangeRatesStorage.from_config(config)
+        updater = RatesUpdater(
+            clients,
+            storage,
+            max_workers=config.UPDATE_MAX_WORKERS,
+            deadline=config.UPDATE_DEADLINE,
+        )
 
         print("INFO: Starting rates update...")
-        result = updater.run_update()
+        if use_async:
+            result = asyncio.run(updater.run_update_async())
+        else:
+            result = updater.run_update()
+
+        if (
+            result
+            and result.get("total_rates", 0) == 0
+            and result.get("unchanged_sources")
+        ):
+            print("Rates are up to date: sources have not published new data.")
+            return
 
         if not result or result.get("total_rates", 0) == 0:
             print("ERROR: No rates fetched from any client")
@@ -289,6 +309,91 @@ def handle_show_rates(
         print(f"ERROR: {e}")
 
 
+def handle_rate_history(
+    from_cur: str | None = None,
+    to_cur: str | None = None,
+    limit: int | None = None,
+    since: str | None = None,
+    until: str | None = None,
+):
+    """Показывает историю курсов пары из хранилища Parser Service.
+
+    Args:
+        from_cur (str | None): Фильтр по исходной валюте.
+        to_cur (str | None): Фильтр по целевой валюте.
+        limit (int | None): Количество последних записей.
+        since (str | None): Начало интервала (ISO, включительно).
+        until (str | None): Конец интервала (ISO, включительно).
+    """
+    try:
+        storage = ExchangeRatesStorage.from_config(ParserConfig())
+        records = storage.get_history(
+            from_cur.upper() if from_cur else None,
+            to_cur.upper() if to_cur else None,
+            limit=limit if limit and limit > 0 else 10,
+            since=since,
+            until=until,
+        )
+        if not records:
+            print("История курсов для запроса пуста.")
+            return
+
+        for record in records:
+            print(
+                f"- {record['timestamp']} {record['from_currency']}→"
+                f"{record['to_currency']}: {record['rate']} "
+                f"(source: {record.get('source', 'Unknown')})"
+            )
+
+    except Exception as e:
+        print(f"ERROR: {e}")
+
+
+def handle_convert_history(source: str | None = None):
+    """Переносит историю курсов из JSON-массива в формат HISTORY_FORMAT.
+
+    Args:
+        source (str | None): Путь к истории в формате JSON-массива.
+    """
+    try:
+        config = ParserConfig()
+        if config.HISTORY_FORMAT == "json":
+            print("История уже хранится в формате JSON-массива.")
+            print("Укажите HISTORY_FORMAT=ndjson, partitioned или columnar в .env.")
+            return
+
+        rates_path = Path(config.RATES_FILE_PATH or "data/rates.json")
+        source_path = (
+            Path(source) if source else rates_path.with_name("exchange_rates.json")
+        )
+        if not source_path.exists():
+            print(f"Файл истории '{source_path}' не найден.")
+            return
+
+        storage = ExchangeRatesStorage.from_config(config)
+        count = convert_json_history(source_path, storage.history)
+        print(f"Перенесено записей: {count}. История: {storage.history.path}")
+
+    except Exception as e:
+        print(f"ERROR: {e}")
+
+
+def handle_migrate_portfolios():
+    """Раскладывает монолитный portfolios.json по файлам-шардам."""
+    try:
+        backend = DatabaseManager().backend
+        if not isinstance(backend, ShardedStorageBackend):
+            print('Команда доступна только при storage_backend = "sharded".')
+            return
+
+        count = backend.migrate_from_file()
+        print(f"Перенесено портфелей: {count}.")
+        print(f"Каталог шардов: {backend.portfolios_dir}")
+
+    except Exception as e:
+        print(f"ERROR: {e}")
+
+
 class MyArgumentParser(ArgumentParser):
     def error(self, message: str):
         raise ValueError(message)
@@ -340,6 +445,7 @@ def build_parser() -> ArgumentParser:
 
     p_update_rates = sub.add_parser("update-rates", add_help=False)
     p_update_rates.add_argument("-s", "--source", type=str, required=False)
+    p_update_rates.add_argument("--async", dest="use_async", action="store_true")
     p_update_rates.set_defaults(command="update-rates")
 
     p_show_rates = sub.add_parser("show-rates", add_help=False)
@@ -348,6 +454,21 @@ def build_parser() -> ArgumentParser:
     p_show_rates.add_argument("-b", "--base", type=str, required=False)
     p_show_rates.set_defaults(command="show-rates")
 
+    p_history = sub.add_parser("rate-history", add_help=False)
+    p_history.add_argument("-f", "--from", dest="from_cur", type=str, required=False)
+    p_history.add_argument("-t", "--to", dest="to_cur", type=str, required=False)
+    p_history.add_argument("-l", "--limit", type=int, required=False)
+    p_history.add_argument("--since", type=str, required=False)
+    p_history.add_argument("--until", type=str, required=False)
+    p_history.set_defaults(command="rate-history")
+
+    p_convert = sub.add_parser("convert-history", add_help=False)
+    p_convert.add_argument("-s", "--source", type=str, required=False)
+    p_convert.set_defaults(command="convert-history")
+
+    p_migrate = sub.add_parser("migrate-portfolios", add_help=False)
+    p_migrate.set_defaults(command="migrate-portfolios")
+
     return parser
 
 
@@ -431,11 +552,20 @@ def process_command(logged_id, parser, tokens):
                 print(format_rate_result(result))
             return logged_id, True
         case "update-rates":
-            handle_update_rates(ns.source)
+            handle_update_rates(ns.source, ns.use_async)
             return logged_id, True
         case "show-rates":
             handle_show_rates(ns.currency, ns.top, ns.base)
             return logged_id, True
+        case "rate-history":
+            handle_rate_history(ns.from_cur, ns.to_cur, ns.limit, ns.since, ns.until)
+            return logged_id, True
+        case "convert-history":
+            handle_convert_history(ns.source)
+            return logged_id, True
+        case "migrate-portfolios":
+            handle_migrate_portfolios()
+            return logged_id, True
         case _:
             return logged_id, True
 
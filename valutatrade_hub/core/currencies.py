@@ -172,3 +172,19 @@ def get_supported_currencies() -> list[str]:
         list[str]: Отсортированный список кодов валют.
     """
     return sorted(_CURRENCY_REGISTRY.keys())
+
+
+def register_currency(currency: Currency) -> Currency:
+    """Добавляет валюту в реестр, если ее код еще не зарегистрирован.
+
+    Используется для валют, которые становятся известны из данных
+    источника курсов (например, полной таблицы ExchangeRate-API).
+    Уже зарегистрированные валюты не заменяются.
+
+    Args:
+        currency (Currency): Регистрируемая валюта.
+
+    Returns:
+        Currency: Валюта из реестра с этим кодом.
+    """
+    return _CURRENCY_REGISTRY.setdefault(currency.code, currency)
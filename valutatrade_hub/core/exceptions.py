@@ -16,6 +16,25 @@ class InsufficientFundsError(Exception):
 
 
 class ApiRequestError(Exception):
-    def __init__(self, reason: str):
+    def __init__(
+        self,
+        reason: str,
+        status_code: int | None = None,
+        retry_after: float | None = None,
+    ):
         self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
         super().__init__(f"Ошибка при обращении к внешнему API: {reason}")
+
+
+class ProviderUnavailableError(ApiRequestError):
+    """Источник курсов временно отключен (разомкнут предохранитель)."""
+
+    def __init__(self, provider: str, retry_in: float):
+        self.provider = provider
+        self.retry_in = retry_in
+        super().__init__(
+            f"{provider} is unavailable, next attempt in {retry_in:.0f}s",
+            retry_after=retry_in,
+        )
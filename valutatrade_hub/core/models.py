@@ -4,6 +4,7 @@ from secrets import token_hex
 
 from valutatrade_hub.core.currencies import get_currency
 from valutatrade_hub.core.exceptions import InsufficientFundsError
+from valutatrade_hub.core.rates import current_snapshot
 
 
 class User:
@@ -281,7 +282,6 @@ class Portfolio:
 
     _user_id: int
     _wallets: dict[str, Wallet]
-    EXCHANGE_RATES: dict = {}
 
     def __init__(self, user_id: int, wallets: dict[str, Wallet]) -> None:
         if not isinstance(user_id, int) or user_id <= 0:
@@ -388,34 +388,7 @@ class Portfolio:
         """
         if from_cur == to_cur:
             return 1.0
-        pair = f"{from_cur}_{to_cur}"
-        rec = Portfolio.EXCHANGE_RATES.get(pair)
-        if isinstance(rec, dict) and "rate" in rec:
-            rate = rec["rate"]
-            if not isinstance(rate, (int, float)) or rate <= 0:
-                raise ValueError(
-                    f"Invalid exchange rate for pair '{from_cur}' to '{to_cur}': {rate}"
-                )
-            return float(rate)
-        reverse_pair = f"{to_cur}_{from_cur}"
-        rec = Portfolio.EXCHANGE_RATES.get(reverse_pair)
-        if isinstance(rec, dict) and "rate" in rec:
-            rate = rec["rate"]
-            if not isinstance(rate, (int, float)) or rate <= 0:
-                raise ValueError(
-                    f"Invalid exchange rate for pair '{to_cur}' to '{from_cur}': {rate}"
-                )
-            return 1.0 / float(rate)
-        if from_cur != "USD" and to_cur != "USD":
-            try:
-                from_to_usd = Portfolio.get_rate(from_cur, "USD")
-                usd_to_target = Portfolio.get_rate("USD", to_cur)
-                return from_to_usd * usd_to_target
-            except ValueError:
-                pass
-        raise ValueError(
-            f"Exchange rate for pair '{from_cur}' to '{to_cur}' not found."
-        )
+        return current_snapshot().rate(from_cur, to_cur)
 
     def get_total_value(self, base_currency: str = "USD") -> float:
         """Вычисляет общую стоимость всех кошельков в указанной валюте.
@@ -433,6 +406,7 @@ class Portfolio:
             raise ValueError("base_currency must be a non-empty string.")
         base = base_currency.strip().upper()
 
+        snapshot = current_snapshot()
         total_in_base = 0.0
         for code, wallet in self._wallets.items():
             cur = code.upper()
@@ -441,7 +415,7 @@ class Portfolio:
             if amount == 0.0:
                 continue
 
-            rate = Portfolio.get_rate(cur, base)
+            rate = snapshot.rate(cur, base)
             total_in_base += amount * rate
 
         return total_in_base
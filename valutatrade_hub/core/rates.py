@@ -0,0 +1,565 @@
+import heapq
+import math
+import threading
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Mapping
+
+from valutatrade_hub.core.currencies import (
+    CryptoCurrency,
+    FiatCurrency,
+    get_currency,
+)
+from valutatrade_hub.core.exceptions import CurrencyNotFoundError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Устаревание ребра без корректного updated_at, секунды.
+_UNKNOWN_STALENESS = 1e12
+
+
+def parse_rate_timestamp(value: object) -> datetime | None:
+    """Разбирает время в ISO-формате; для некорректных значений — None."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class RateTable:
+    """Полная таблица курсов одного источника относительно базовой валюты.
+
+    Хранится в rates.json в "tables" компактно: список кодов и
+    параллельный ему вектор курсов (сколько единиц валюты дает 1 единица
+    base), без отдельной записи на каждую пару.
+
+    Attributes:
+        source (str): Имя источника.
+        base (str): Базовая валюта таблицы.
+        codes (tuple[str, ...]): Коды валют.
+        rates (array): Курсы: 1 base = rates[i] единиц codes[i].
+        names (tuple[str, ...]): Названия валют (пустая строка, если
+            неизвестно).
+        updated_at (str | None): Время получения таблицы (ISO).
+        ids (Mapping[str, int]): Номер валюты по коду.
+    """
+
+    source: str
+    base: str
+    codes: tuple[str, ...]
+    rates: array
+    names: tuple[str, ...] = ()
+    updated_at: str | None = None
+    ids: Mapping[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_cache(cls, source: str, data: Mapping) -> "RateTable | None":
+        """Создает таблицу из записи "tables" в rates.json.
+
+        Returns:
+            RateTable | None: Таблица или None, если запись невалидна.
+        """
+        if not isinstance(data, Mapping):
+            return None
+        base = data.get("base")
+        codes = data.get("codes")
+        rates = data.get("rates")
+        if not isinstance(base, str) or not isinstance(codes, list):
+            return None
+        if not isinstance(rates, list) or len(rates) != len(codes):
+            return None
+        try:
+            vector = array("d", rates)
+        except TypeError:
+            return None
+        names = data.get("names")
+        if not isinstance(names, list) or len(names) != len(codes):
+            names = [""] * len(codes)
+        return cls(
+            source=source,
+            base=base,
+            codes=tuple(codes),
+            rates=vector,
+            names=tuple(names),
+            updated_at=data.get("updated_at"),
+            ids=MappingProxyType({code: i for i, code in enumerate(codes)}),
+        )
+
+    def per_base(self, code: str) -> float | None:
+        """Возвращает количество единиц code за 1 единицу base или None."""
+        if code == self.base:
+            return 1.0
+        i = self.ids.get(code)
+        if i is None:
+            return None
+        value = self.rates[i]
+        return value if value > 0 else None
+
+
+class CrossRateMatrix:
+    """Матрица кросс-курсов N×N, построенная по одному снимку курсов.
+
+    Валютам снимка присваиваются небольшие целые номера, а в ячейке [i][j]
+    хранится курс i -> j (1 единица i = rate единиц j) или NaN, если курс
+    не выводится из снимка. Матрица — массив NumPy, если он установлен,
+    иначе список массивов array('d'). Прямые и обратные курсы берутся из
+    снимка как есть, а остальные выводятся по графу валют, ребра которого —
+    пары снимка: для каждой валюты алгоритм Дейкстры находит путь с
+    наименьшим числом обменов, а среди равных — с наименее устаревшими
+    курсами (по updated_at). Все курсы вычисляются один раз при
+    построении, поэтому получение курса — это два поиска в словаре и
+    чтение ячейки, а новые провайдеры с другой базовой валютой не требуют
+    изменений кода.
+
+    Валюты, которых нет среди пар, берутся из полных таблиц курсов
+    (RateTable): курс считается через базовую валюту таблицы, поэтому
+    таблица на сотни валют не увеличивает размер матрицы.
+
+    Attributes:
+        codes (list[str]): Коды валют в порядке номеров.
+        ids (dict[str, int]): Номер валюты по коду.
+        tables (tuple[RateTable, ...]): Полные таблицы курсов.
+    """
+
+    def __init__(
+        self,
+        source: Mapping[str, Mapping],
+        updated_at: Mapping[str, datetime | None] | None = None,
+        tables: tuple[RateTable, ...] = (),
+    ):
+        pairs: dict[tuple[str, str], object] = {}
+        updated: dict[tuple[str, str], float | None] = {}
+        for pair_key, rec in source.items():
+            if not isinstance(rec, Mapping) or "rate" not in rec or "_" not in pair_key:
+                continue
+            from_cur, to_cur = pair_key.split("_", 1)
+            pairs[(from_cur, to_cur)] = rec["rate"]
+            if updated_at is not None:
+                ts = updated_at.get(pair_key)
+            else:
+                ts = parse_rate_timestamp(rec.get("updated_at"))
+            updated[(from_cur, to_cur)] = None if ts is None else ts.timestamp()
+
+        self.codes = sorted({code for pair in pairs for code in pair})
+        self.ids = {code: i for i, code in enumerate(self.codes)}
+        self.tables = tuple(tables)
+        self._errors: dict[tuple[int, int], str] = {}
+
+        n = len(self.codes)
+        if np is not None:
+            self._matrix = np.full((n, n), np.nan)
+        else:
+            self._matrix = [array("d", [math.nan]) * n for _ in range(n)]
+        for i in range(n):
+            self._matrix[i][i] = 1.0
+
+        for i, from_cur in enumerate(self.codes):
+            for j, to_cur in enumerate(self.codes):
+                if i != j:
+                    self._resolve_direct(pairs, i, j, from_cur, to_cur)
+
+        graph = self._build_graph(pairs, updated)
+        for i in range(n):
+            self._resolve_paths(graph, i)
+
+    def _build_graph(
+        self,
+        pairs: dict[tuple[str, str], object],
+        updated: dict[tuple[str, str], float | None],
+    ) -> list[list[tuple[int, float, float]]]:
+        known = [ts for ts in updated.values() if ts is not None]
+        newest = max(known, default=0.0)
+
+        graph: list[list[tuple[int, float, float]]] = [[] for _ in self.codes]
+        for (from_cur, to_cur), rate in pairs.items():
+            if not isinstance(rate, (int, float)) or rate <= 0:
+                continue
+            ts = updated[(from_cur, to_cur)]
+            staleness = _UNKNOWN_STALENESS if ts is None else newest - ts
+            i, j = self.ids[from_cur], self.ids[to_cur]
+            graph[i].append((j, float(rate), staleness))
+            graph[j].append((i, 1.0 / float(rate), staleness))
+        return graph
+
+    def _resolve_paths(
+        self, graph: list[list[tuple[int, float, float]]], source: int
+    ) -> None:
+        row = self._matrix[source]
+        visited = set()
+        heap = [(0, 0.0, source, 1.0)]
+        while heap:
+            hops, staleness, node, rate = heapq.heappop(heap)
+            if node in visited:
+                continue
+            visited.add(node)
+            if (source, node) not in self._errors and math.isnan(row[node]):
+                row[node] = rate
+            for target, edge_rate, edge_staleness in graph[node]:
+                if target not in visited:
+                    heapq.heappush(
+                        heap,
+                        (
+                            hops + 1,
+                            staleness + edge_staleness,
+                            target,
+                            rate * edge_rate,
+                        ),
+                    )
+
+    def _resolve_direct(
+        self,
+        pairs: dict[tuple[str, str], object],
+        i: int,
+        j: int,
+        from_cur: str,
+        to_cur: str,
+    ) -> None:
+        for key, invert in (((from_cur, to_cur), False), ((to_cur, from_cur), True)):
+            if key not in pairs:
+                continue
+            rate = pairs[key]
+            if not isinstance(rate, (int, float)) or rate <= 0:
+                self._errors[(i, j)] = (
+                    f"Invalid exchange rate for pair '{key[0]}' to '{key[1]}': {rate}"
+                )
+                return
+            self._matrix[i][j] = 1.0 / float(rate) if invert else float(rate)
+            return
+
+    def _per_base(self, table: RateTable, code: str) -> float | None:
+        value = table.per_base(code)
+        if value is not None:
+            return value
+        i = self.ids.get(table.base)
+        j = self.ids.get(code)
+        if i is None or j is None or (i, j) in self._errors:
+            return None
+        value = float(self._matrix[i][j])
+        return None if math.isnan(value) or value <= 0 else value
+
+    def rate(self, from_cur: str, to_cur: str) -> float:
+        """Возвращает курс обмена from_cur -> to_cur.
+
+        Args:
+            from_cur (str): Код исходной валюты.
+            to_cur (str): Код целевой валюты.
+
+        Raises:
+            ValueError: Если курс не найден или невалиден.
+
+        Returns:
+            float: Курс обмена (1 единица from_cur = rate единиц to_cur).
+        """
+        if from_cur == to_cur:
+            return 1.0
+        i = self.ids.get(from_cur)
+        j = self.ids.get(to_cur)
+        if i is not None and j is not None:
+            error = self._errors.get((i, j))
+            if error is not None:
+                raise ValueError(error)
+            value = float(self._matrix[i][j])
+            if not math.isnan(value):
+                return value
+        for table in self.tables:
+            from_per_base = self._per_base(table, from_cur)
+            to_per_base = self._per_base(table, to_cur)
+            if from_per_base is not None and to_per_base is not None:
+                return to_per_base / from_per_base
+        raise ValueError(
+            f"Exchange rate for pair '{from_cur}' to '{to_cur}' not found."
+        )
+
+
+@dataclass(frozen=True)
+class RatesSnapshot:
+    """Неизменяемый снимок курсов с номером версии.
+
+    Снимок создается целиком до публикации и после нее не меняется:
+    записи пар завернуты в MappingProxyType, время обновления разобрано
+    заранее, а матрица кросс-курсов построена при создании. Поэтому
+    потоки могут читать один и тот же снимок без блокировок.
+
+    Attributes:
+        version (int): Номер версии; растет с каждой публикацией.
+        pairs (Mapping[str, Mapping]): Записи пар {"BTC_USD": {...}}.
+        last_refresh (str | None): Время обновления кэша курсов (ISO).
+        last_refresh_at (datetime | None): То же время в виде datetime.
+        updated_at (Mapping[str, datetime | None]): Время курса по паре.
+        matrix (CrossRateMatrix): Матрица кросс-курсов снимка.
+        tables (tuple[RateTable, ...]): Полные таблицы курсов источников.
+    """
+
+    version: int
+    pairs: Mapping[str, Mapping]
+    last_refresh: str | None = None
+    last_refresh_at: datetime | None = None
+    updated_at: Mapping[str, datetime | None] = field(default_factory=dict)
+    matrix: CrossRateMatrix = field(default_factory=lambda: CrossRateMatrix({}))
+    tables: tuple[RateTable, ...] = ()
+
+    @classmethod
+    def build(
+        cls,
+        pairs: Mapping[str, Mapping],
+        last_refresh: str | None,
+        version: int,
+        tables: Mapping[str, Mapping] | None = None,
+    ) -> "RatesSnapshot":
+        """Создает снимок из записей пар кэша курсов.
+
+        Args:
+            pairs (Mapping[str, Mapping]): Записи пар из rates.json.
+            last_refresh (str | None): Время обновления кэша (ISO).
+            version (int): Номер версии снимка.
+            tables (Mapping[str, Mapping] | None): Полные таблицы курсов
+                ("tables" из rates.json).
+
+        Returns:
+            RatesSnapshot: Новый снимок.
+        """
+        frozen = MappingProxyType(
+            {
+                key: MappingProxyType(dict(rec))
+                for key, rec in pairs.items()
+                if isinstance(rec, Mapping)
+            }
+        )
+        updated_at = MappingProxyType(
+            {
+                key: parse_rate_timestamp(rec.get("updated_at"))
+                for key, rec in frozen.items()
+            }
+        )
+        rate_tables = tuple(
+            table
+            for table in (
+                RateTable.from_cache(source, data)
+                for source, data in (tables or {}).items()
+            )
+            if table is not None
+        )
+        return cls(
+            version=version,
+            pairs=frozen,
+            last_refresh=last_refresh,
+            last_refresh_at=parse_rate_timestamp(last_refresh),
+            updated_at=updated_at,
+            matrix=CrossRateMatrix(frozen, updated_at, rate_tables),
+            tables=rate_tables,
+        )
+
+    def get(self, pair_key: str) -> Mapping | None:
+        """Возвращает запись пары или None."""
+        return self.pairs.get(pair_key)
+
+    def rate(self, from_cur: str, to_cur: str) -> float:
+        """Возвращает курс обмена from_cur -> to_cur (см. CrossRateMatrix.rate)."""
+        return self.matrix.rate(from_cur, to_cur)
+
+    def table_for(self, code: str) -> RateTable | None:
+        """Возвращает полную таблицу курсов, содержащую валюту code, или None."""
+        for table in self.tables:
+            if code in table.ids:
+                return table
+        return None
+
+
+_current = RatesSnapshot(version=0, pairs=MappingProxyType({}))
+_publish_lock = threading.Lock()
+
+
+def current_snapshot() -> RatesSnapshot:
+    """Возвращает опубликованный снимок курсов.
+
+    Чтение ссылки атомарно, поэтому блокировка не нужна; вызывающий код
+    должен брать снимок один раз на операцию, чтобы все курсы в ней были
+    согласованы.
+    """
+    return _current
+
+
+def publish_snapshot(
+    pairs: Mapping[str, Mapping],
+    last_refresh: str | None,
+    tables: Mapping[str, Mapping] | None = None,
+) -> RatesSnapshot:
+    """Строит новый снимок курсов и атомарно заменяет им текущий.
+
+    Args:
+        pairs (Mapping[str, Mapping]): Записи пар из rates.json.
+        last_refresh (str | None): Время обновления кэша (ISO).
+        tables (Mapping[str, Mapping] | None): Полные таблицы курсов.
+
+    Returns:
+        RatesSnapshot: Опубликованный снимок.
+    """
+    global _current
+    with _publish_lock:
+        snapshot = RatesSnapshot.build(
+            pairs, last_refresh, _current.version + 1, tables
+        )
+        _current = snapshot
+    return snapshot
+
+
+def _currency_class(code: str) -> str | None:
+    try:
+        currency = get_currency(code)
+    except CurrencyNotFoundError:
+        return None
+    if isinstance(currency, CryptoCurrency):
+        return "crypto"
+    if isinstance(currency, FiatCurrency):
+        return "fiat"
+    return None
+
+
+def pair_currency_class(pair_key: str) -> str | None:
+    """Возвращает класс пары: "crypto", если в ней есть криптовалюта, иначе "fiat".
+
+    Для пар с валютами вне реестра возвращает None.
+    """
+    classes = {_currency_class(code) for code in pair_key.split("_", 1)}
+    if "crypto" in classes:
+        return "crypto"
+    if classes == {"fiat"}:
+        return "fiat"
+    return None
+
+
+@dataclass(frozen=True)
+class RatesFreshness:
+    """Результат проверки кэша курсов политикой TTL.
+
+    Attributes:
+        overdue (float | None): На сколько секунд самая устаревшая пара
+            превысила свой TTL (<= 0 — кэш свежий); None, если кэша нет или
+            он невалиден.
+        sources (frozenset[str] | None): Источники, которые нужно обновить;
+            None — все источники.
+    """
+
+    overdue: float | None
+    sources: frozenset[str] | None = None
+
+
+class RatesTtlPolicy:
+    """TTL курсов по источникам и классам валют.
+
+    TTL пары берется из by_source по источнику пары, затем из by_class по
+    классу пары ("crypto" или "fiat"), иначе используется default_ttl.
+    Пара считается проверенной в момент своего updated_at или последнего
+    опроса ее источника (checked_at в rates.checked.json), смотря
+    что позже, поэтому источник, вернувший ошибку, не опрашивается
+    повторно до истечения его TTL.
+
+    Attributes:
+        default_ttl (float): TTL по умолчанию, секунды.
+        by_source (dict[str, float]): TTL по имени источника.
+        by_class (dict[str, float]): TTL по классу валют.
+    """
+
+    def __init__(
+        self,
+        default_ttl: float,
+        by_source: Mapping[str, float] | None = None,
+        by_class: Mapping[str, float] | None = None,
+    ):
+        self.default_ttl = float(default_ttl)
+        self.by_source = {k: float(v) for k, v in (by_source or {}).items()}
+        self.by_class = {k: float(v) for k, v in (by_class or {}).items()}
+
+    def ttl_for(self, source: str | None, currency_class: str | None) -> float:
+        """Возвращает TTL для источника и класса валют, секунды."""
+        if source in self.by_source:
+            return self.by_source[source]
+        if currency_class in self.by_class:
+            return self.by_class[currency_class]
+        return self.default_ttl
+
+    def check(
+        self,
+        rates_data: Mapping,
+        providers: Mapping[str, str],
+        now: datetime | None = None,
+        checked: Mapping[str, Mapping] | None = None,
+    ) -> RatesFreshness:
+        """Определяет, какие источники нужно обновить.
+
+        Args:
+            rates_data (Mapping): Содержимое rates.json.
+            providers (Mapping[str, str]): Класс валют по имени источника.
+            now (datetime | None): Текущее время (UTC).
+            checked (Mapping[str, Mapping] | None): Время опроса источников
+                {имя: {"checked_at": ISO}} из rates.checked.json. Учитывается
+                и "sources" из rates.json, записанный прежними версиями.
+
+        Returns:
+            RatesFreshness: Насколько устарел кэш и что обновлять.
+        """
+        pairs = rates_data.get("pairs") if rates_data else None
+        if not pairs or not isinstance(pairs, Mapping):
+            return RatesFreshness(overdue=None)
+        now_ts = (now or datetime.now(timezone.utc)).timestamp()
+
+        checked_at: dict[str, float] = {}
+        for sources in (rates_data.get("sources"), checked):
+            for name, info in (sources or {}).items():
+                ts = parse_rate_timestamp(info.get("checked_at"))
+                if ts is not None:
+                    checked_at[name] = max(
+                        checked_at.get(name, -math.inf), ts.timestamp()
+                    )
+
+        overdue = -math.inf
+        expired: set[str] = set()
+        refresh_all = False
+        seen: set[str] = set()
+        for pair_key, rec in pairs.items():
+            if not isinstance(rec, Mapping):
+                continue
+            source = rec.get("source")
+            seen.add(source)
+            updated = parse_rate_timestamp(rec.get("updated_at"))
+            fresh_at = max(
+                updated.timestamp() if updated is not None else -math.inf,
+                checked_at.get(source, -math.inf),
+            )
+            pair_overdue = (
+                now_ts - fresh_at - self.ttl_for(source, pair_currency_class(pair_key))
+            )
+            overdue = max(overdue, pair_overdue)
+            if pair_overdue > 0:
+                if source in providers:
+                    expired.add(source)
+                else:
+                    refresh_all = True
+
+        last_refresh = parse_rate_timestamp(rates_data.get("last_refresh"))
+        for source, currency_class in providers.items():
+            if source in seen:
+                continue
+            # Кэш, записанный до появления sources, опрашивал все источники.
+            fresh_at = checked_at.get(
+                source,
+                last_refresh.timestamp() if last_refresh is not None else -math.inf,
+            )
+            source_overdue = now_ts - fresh_at - self.ttl_for(source, currency_class)
+            overdue = max(overdue, source_overdue)
+            if source_overdue > 0:
+                expired.add(source)
+
+        if overdue == -math.inf:
+            return RatesFreshness(overdue=None)
+        if refresh_all:
+            return RatesFreshness(overdue=overdue)
+        return RatesFreshness(overdue=overdue, sources=frozenset(expired))
@@ -1,35 +1,45 @@
-from datetime import datetime, timezone
+import atexit
+import threading
 
-from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.core.exceptions import ApiRequestError, CurrencyNotFoundError
 from valutatrade_hub.decorators import log_action
 from valutatrade_hub.infra.database import DatabaseManager
 from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.infra.singleflight import SingleFlight
+from valutatrade_hub.logging_config import get_logger
 
-from .currencies import get_currency
+from .currencies import Currency, FiatCurrency, get_currency, register_currency
 from .models import Portfolio, User
+from .rates import (
+    RatesFreshness,
+    RatesSnapshot,
+    RatesTtlPolicy,
+    current_snapshot,
+    publish_snapshot,
+)
 
 _db = DatabaseManager()
 _settings = SettingsLoader()
 
-
-def _find_by_id(items: list[dict], user_id: int, item_name: str) -> tuple[dict, int]:
-    for idx, item in enumerate(items):
-        if int(item.get("user_id", -1)) == int(user_id):
-            return item, idx
-    raise ValueError(f"{item_name} с id={user_id} не найден.")
+_refresh_flight = SingleFlight()
+_background_refresh: threading.Thread | None = None
+_background_refresh_lock = threading.Lock()
+_BACKGROUND_JOIN_TIMEOUT = 15.0
 
 
 def _get_user(user_id: int) -> dict:
     """Возвращает пользователя по id."""
-    users = _db.load_users()
-    user, _ = _find_by_id(users, user_id, "Пользователь")
+    user = _db.get_user(user_id)
+    if user is None:
+        raise ValueError(f"Пользователь с id={user_id} не найден.")
     return user
 
 
-def _get_portfolio(user_id: int):
-    portfolios = _db.load_portfolios()
-    portfolio_dict, idx = _find_by_id(portfolios, user_id, "Портфель пользователя")
-    return Portfolio.from_dict(portfolio_dict), idx, portfolios
+def _get_portfolio(user_id: int) -> Portfolio:
+    portfolio_dict = _db.load_portfolio(user_id)
+    if portfolio_dict is None:
+        raise ValueError(f"Портфель пользователя с id={user_id} не найден.")
+    return Portfolio.from_dict(portfolio_dict)
 
 
 @log_action(action_name="REGISTER")
@@ -47,17 +57,10 @@ def register(username: str, password: str) -> dict:
         dict: Словарь с user_id и username зарегистрированного пользователя.
     """
     uname = username.strip()
-    users = _db.load_users()
-    if any(u["username"] == uname for u in users):
+    if _db.find_user(uname) is not None:
         raise ValueError(f"Имя пользователя '{uname}' уже занято.")
-    new_id = max((u["user_id"] for u in users), default=0) + 1
-    new_user = User.from_plain_password(new_id, uname, password)
-    users.append(User.to_dict(new_user))
-    _db.save_users(users)
-    new_portfolio = Portfolio(new_id, {})
-    portfolios = _db.load_portfolios()
-    portfolios.append(Portfolio.to_dict(new_portfolio))
-    _db.save_portfolios(portfolios)
+    new_user = User.from_plain_password(_db.next_user_id(), uname, password)
+    new_id = _db.create_user(User.to_dict(new_user))
     return {"user_id": new_id, "username": uname}
 
 
@@ -76,15 +79,14 @@ def login(username: str, password: str) -> dict:
         dict: Словарь с user_id и username.
     """
     uname = username.strip()
-    users = _db.load_users()
-    for u in users:
-        if u["username"] == uname:
-            user = User.from_dict(u)
-            if user.verify_password(password):
-                return {"user_id": user.user_id, "username": uname}
-            else:
-                raise ValueError("Неверный пароль.")
-    raise ValueError(f"Пользователь '{uname}' не найден.")
+    u = _db.find_user(uname)
+    if u is None:
+        raise ValueError(f"Пользователь '{uname}' не найден.")
+    user = User.from_dict(u)
+    if user.verify_password(password):
+        return {"user_id": user.user_id, "username": uname}
+    else:
+        raise ValueError("Неверный пароль.")
 
 
 def show_portfolio(user_id: int, base: str):
@@ -102,7 +104,7 @@ def show_portfolio(user_id: int, base: str):
     """
     user = _get_user(user_id)
     username = user.get("username", "")
-    portfolio, _, _ = _get_portfolio(user_id)
+    portfolio = _get_portfolio(user_id)
     base_cur = (
         base.strip().upper()
         if isinstance(base, str) and base.strip()
@@ -110,6 +112,7 @@ def show_portfolio(user_id: int, base: str):
     )
 
     _check_and_refresh_rates()
+    snapshot = current_snapshot()
 
     wallets_info = []
     total = 0.0
@@ -117,7 +120,7 @@ def show_portfolio(user_id: int, base: str):
         amount = float(wallet.balance)
 
         try:
-            rate = Portfolio.get_rate(code, base_cur)
+            rate = snapshot.rate(code, base_cur)
         except ValueError:
             raise ValueError(f"Неизвестная базовая валюта '{base_cur}'")
         value_in_base = amount * rate
@@ -148,11 +151,11 @@ def _execute_trade(
 ) -> dict:
     user = _get_user(user_id)
     username = user.get("username", "")
-    currency_code = get_currency(currency).code
+    currency_code = _resolve_currency(currency).code
 
     _check_and_refresh_rates()
 
-    portfolio, portfolio_index, portfolios = _get_portfolio(user_id)
+    portfolio = _get_portfolio(user_id)
 
     if currency_code not in portfolio.wallets:
         if operation == "sell":
@@ -172,8 +175,7 @@ def _execute_trade(
     rate = Portfolio.get_rate(currency_code, _settings.base_currency)
     cost = amount * rate
 
-    portfolios[portfolio_index] = Portfolio.to_dict(portfolio)
-    _db.save_portfolios(portfolios)
+    _db.save_wallet(user_id, currency_code, new_balance)
 
     return {
         "username": username,
@@ -227,65 +229,201 @@ def sell(user_id: int, currency: str, amount: float):
 
 
 def _check_and_refresh_rates() -> None:
-    rates_data = _db.load_rates()
-    if not rates_data:
-        _refresh_rates_from_api()
-        return
+    """Публикует актуальные курсы, при необходимости обновляя их.
+
+    TTL считается по каждой паре (см. RatesTtlPolicy), и обновляются только
+    источники с устаревшими парами. Пока ни одна пара не превысила TTL,
+    используется кэш. Если превышение не больше rates_stale_grace_seconds,
+    устаревший кэш отдается сразу, а обновление запускается в фоновом
+    потоке. Запрос блокируется на обновлении, только если кэша нет или он
+    устарел сильнее.
+    """
+    rates_data = _db.load_rates(shared=True)
+    freshness = _check_rates_freshness(rates_data)
 
-    last_refresh_str = rates_data.get("last_refresh")
-    if not last_refresh_str:
+    if freshness.overdue is None:
         _refresh_rates_from_api()
-        return
+    elif freshness.overdue <= 0:
+        _publish_rates(rates_data)
+    elif freshness.overdue <= _settings.rates_stale_grace:
+        _publish_rates(rates_data)
+        _refresh_in_background(freshness.sources)
+    else:
+        _refresh_rates_from_api(freshness.sources)
 
-    try:
-        last_refresh = datetime.fromisoformat(last_refresh_str.replace("Z", "+00:00"))
-        now = datetime.now(timezone.utc)
-        age_seconds = (now - last_refresh).total_seconds()
-
-        if age_seconds > _settings.rates_ttl:
-            _refresh_rates_from_api()
-        else:
-            pairs = rates_data.get("pairs", {})
-            formatted_rates = {
-                pair_key: pair_data for pair_key, pair_data in pairs.items()
-            }
-            formatted_rates["last_refresh"] = last_refresh_str
-            Portfolio.EXCHANGE_RATES = formatted_rates
-    except (ValueError, AttributeError):
-        _refresh_rates_from_api()
+
+def _check_rates_freshness(rates_data: dict) -> RatesFreshness:
+    policy = RatesTtlPolicy(
+        _settings.rates_ttl,
+        by_source=_settings.rates_ttl_by_source,
+        by_class=_settings.rates_ttl_by_class,
+    )
+    providers = {cls.source_name: cls.currency_class for cls in _provider_classes()}
+    return policy.check(rates_data, providers, checked=_db.load_rates_checked())
 
 
-def _refresh_rates_from_api() -> None:
+def _provider_classes() -> list[type]:
     try:
         from valutatrade_hub.parser_service.api_clients import (
             CoinGeckoClient,
             ExchangeRateApiClient,
         )
+    except ImportError:
+        return []
+    return [CoinGeckoClient, ExchangeRateApiClient]
+
+
+@atexit.register
+def _wait_background_refresh() -> None:
+    """Дает фоновому обновлению завершиться перед выходом процесса.
+
+    Ожидание ограничено _BACKGROUND_JOIN_TIMEOUT секундами; записи кэша и
+    истории атомарны, поэтому прерванное обновление не портит файлы.
+    """
+    thread = _background_refresh
+    if thread is not None and thread.is_alive():
+        thread.join(_BACKGROUND_JOIN_TIMEOUT)
+
+
+def _refresh_in_background(sources: frozenset[str] | None = None) -> None:
+    """Запускает обновление курсов в фоновом потоке, если оно еще не идет."""
+    global _background_refresh
+    with _background_refresh_lock:
+        if _background_refresh is not None and _background_refresh.is_alive():
+            return
+        _background_refresh = threading.Thread(
+            target=_background_refresh_worker,
+            args=(sources,),
+            name="rates-refresh",
+            daemon=True,
+        )
+        _background_refresh.start()
+
+
+def _background_refresh_worker(sources: frozenset[str] | None) -> None:
+    try:
+        _refresh_rates_from_api(sources)
+    except ApiRequestError as e:
+        get_logger().warning(f"Background rates refresh failed: {e.reason}")
+
+
+def _publish_rates(rates_data: dict) -> None:
+    """Публикует снимок курсов, если кэш курсов изменился с прошлой публикации."""
+    last_refresh = rates_data.get("last_refresh")
+    snapshot = current_snapshot()
+    if snapshot.version and snapshot.last_refresh == last_refresh:
+        return
+    snapshot = publish_snapshot(
+        rates_data.get("pairs", {}), last_refresh, rates_data.get("tables")
+    )
+    _register_table_currencies(snapshot)
+
+
+def _register_table_currencies(snapshot: RatesSnapshot) -> None:
+    """Регистрирует валюты полных таблиц курсов как фиатные."""
+    for table in snapshot.tables:
+        for code, name in zip(table.codes, table.names):
+            try:
+                register_currency(FiatCurrency(name or code, code, "—"))
+            except ValueError:
+                continue
+
+
+def _resolve_currency(code: str) -> Currency:
+    """Возвращает валюту по коду, при необходимости загрузив таблицы курсов.
+
+    Валюты из полных таблиц курсов попадают в реестр при публикации
+    снимка, поэтому для незнакомого кода сначала загружается кэш курсов.
+    """
+    try:
+        return get_currency(code)
+    except CurrencyNotFoundError as e:
+        try:
+            _check_and_refresh_rates()
+        except ApiRequestError:
+            raise e
+        return get_currency(code)
+
+
+def _refresh_rates_from_api(sources: frozenset[str] | None = None) -> None:
+    """Обновляет курсы из API, объединяя одновременные обновления.
+
+    Args:
+        sources (frozenset[str] | None): Имена источников для обновления;
+            None — все источники.
+
+    Одновременные обновления того же набора источников объединяются:
+    другие потоки ждут результата уже идущего обновления, а другие
+    процессы — снятия блокировки rates.json.lock. Получив блокировку,
+    обновление сначала перечитывает кэш и пропускает запросы к API, если
+    запрошенные источники уже обновил кто-то другой.
+    """
+    _refresh_flight.do(
+        lambda: _fetch_rates_from_api(sources),
+        lock_path=_db.rates_lock_path,
+        recheck=lambda: _rates_refreshed_elsewhere(sources),
+        key=sources,
+    )
+
+
+def _rates_refreshed_elsewhere(sources: frozenset[str] | None = None) -> bool:
+    """Проверяет, что запрошенные источники уже свежие, и публикует кэш.
+
+    Args:
+        sources (frozenset[str] | None): Нужные источники; None — все.
+    """
+    rates_data = _db.load_rates(shared=True)
+    freshness = _check_rates_freshness(rates_data)
+    if freshness.overdue is None:
+        return False
+    if freshness.overdue > 0 and (
+        sources is None or freshness.sources is None or freshness.sources & sources
+    ):
+        return False
+    _publish_rates(rates_data)
+    return True
+
+
+def _fetch_rates_from_api(sources: frozenset[str] | None = None) -> None:
+    try:
         from valutatrade_hub.parser_service.config import ParserConfig
         from valutatrade_hub.parser_service.storage import ExchangeRatesStorage
         from valutatrade_hub.parser_service.updater import RatesUpdater
 
         config = ParserConfig()
+        provider_classes = _provider_classes()
+        if not provider_classes:
+            raise ImportError("API clients are not available")
         clients = [
-            CoinGeckoClient(config),
-            ExchangeRateApiClient(config),
+            cls(config)
+            for cls in provider_classes
+            if sources is None or cls.source_name in sources
         ]
-        rates_path = config.RATES_FILE_PATH or "data/rates.json"
-        history_path = config.HISTORY_FILE_PATH or "data/exchange_rates.json"
-
-        storage = ExchangeRatesStorage(history_path, rates_path)
-        updater = RatesUpdater(clients, storage)
+        storage = ExchangeRatesStorage.from_config(config)
+        updater = RatesUpdater(
+            clients,
+            storage,
+            max_workers=config.UPDATE_MAX_WORKERS,
+            deadline=config.UPDATE_DEADLINE,
+        )
         result = updater.run_update()
 
         if not result or result.get("total_rates", 0) == 0:
+            rates_data = _db.load_rates(shared=True)
+            if result and result.get("unchanged_sources") and rates_data.get("pairs"):
+                get_logger().info("Rates not modified at source, serving cached rates")
+                _publish_rates(rates_data)
+                return
+            if result and result.get("skipped_sources") and rates_data.get("pairs"):
+                get_logger().warning(
+                    "Rate providers unavailable "
+                    f"({', '.join(result['skipped_sources'])}), serving cached rates"
+                )
+                _publish_rates(rates_data)
+                return
             raise ApiRequestError("Failed to fetch rates from any source")
 
-        rates_data = _db.load_rates()
-        pairs = rates_data.get("pairs", {})
-        formatted_rates = {pair_key: pair_data for pair_key, pair_data in pairs.items()}
-        formatted_rates["last_refresh"] = rates_data.get("last_refresh")
-
-        Portfolio.EXCHANGE_RATES = formatted_rates
+        _publish_rates(_db.load_rates(shared=True))
     except ImportError as e:
         raise ApiRequestError(f"Parser service not available: {e}")
     except Exception as e:
@@ -309,23 +447,26 @@ def get_rate(from_cur: str, to_cur: str) -> dict:
         dict: Информация о курсе (from_currency, to_currency, rate,
             reverse_rate, updated_at).
     """
-    from_currency_obj = get_currency(from_cur)
-    to_currency_obj = get_currency(to_cur)
+    from_currency_obj = _resolve_currency(from_cur)
+    to_currency_obj = _resolve_currency(to_cur)
     from_code = from_currency_obj.code
     to_code = to_currency_obj.code
 
     _check_and_refresh_rates()
+    snapshot = current_snapshot()
 
-    rate = Portfolio.get_rate(from_code, to_code)
+    rate = snapshot.rate(from_code, to_code)
     reverse_rate = 1.0 / rate if rate != 0 else 0.0
 
     pair = f"{from_code}_{to_code}"
     reverse_pair = f"{to_code}_{from_code}"
 
-    rec = Portfolio.EXCHANGE_RATES.get(pair) or Portfolio.EXCHANGE_RATES.get(
-        reverse_pair
-    )
-    updated_at = rec.get("updated_at") if isinstance(rec, dict) else None
+    rec = snapshot.get(pair) or snapshot.get(reverse_pair)
+    if rec is not None:
+        updated_at = rec.get("updated_at")
+    else:
+        table = snapshot.table_for(from_code) or snapshot.table_for(to_code)
+        updated_at = table.updated_at if table is not None else None
 
     return {
         "from_currency": from_code,
@@ -1,13 +1,109 @@
+import gzip
 import json
+import os
+import threading
 from pathlib import Path
-from typing import Callable, TypeVar
+from typing import Any, Callable, TypeVar
+
+from valutatrade_hub.infra.settings import SettingsLoader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
 
 T = TypeVar("T")
 
+_DECODE_ERRORS: tuple[type[Exception], ...] = (ValueError,)
+if msgspec is not None:
+    _DECODE_ERRORS += (msgspec.DecodeError,)
+
+
+def _get_codec() -> str:
+    return str(SettingsLoader().get("json_codec", "pretty")).lower()
+
+
+def _is_gzip(path: Path) -> bool:
+    return path.suffix == ".gz"
+
+
+def encode_json(data: Any, codec: str | None = None) -> bytes:
+    """Кодирует данные в JSON выбранным кодеком.
+
+    Args:
+        data (Any): Данные для кодирования.
+        codec (str | None): "pretty" (отступ 4), "compact" (без пробелов)
+            или "fast" (orjson/msgspec, если установлены, иначе "compact").
+            По умолчанию берется из настройки json_codec.
+
+    Returns:
+        bytes: JSON в кодировке UTF-8.
+    """
+    codec = codec or _get_codec()
+    if codec == "fast":
+        if orjson is not None:
+            return orjson.dumps(data)
+        if msgspec is not None:
+            return msgspec.json.encode(data)
+        codec = "compact"
+    if codec == "compact":
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, indent=4).encode("utf-8")
+
+
+def decode_json(raw: bytes | str) -> Any:
+    """Декодирует JSON, используя самый быстрый доступный декодер.
+
+    Args:
+        raw (bytes | str): JSON-документ.
+
+    Raises:
+        ValueError: Если документ не является корректным JSON.
+
+    Returns:
+        Any: Декодированные данные.
+    """
+    try:
+        if orjson is not None:
+            return orjson.loads(raw)
+        if msgspec is not None:
+            return msgspec.json.decode(raw)
+        return json.loads(raw)
+    except _DECODE_ERRORS as e:
+        raise ValueError(f"Invalid JSON: {e}")
+
+
+def read_json_bytes(path) -> bytes:
+    """Читает JSON-документ из файла без декодирования.
+
+    Файлы с расширением .gz прозрачно распаковываются.
+
+    Args:
+        path: Путь к файлу.
+
+    Raises:
+        OSError: Если файл не удалось прочитать.
+        EOFError: Если сжатый файл оборван.
+
+    Returns:
+        bytes: Содержимое документа.
+    """
+    path = Path(path)
+    opener = gzip.open if _is_gzip(path) else open
+    with opener(path, "rb") as f:
+        return f.read()
+
 
 def load_json(path, default: Callable[[], T] = list) -> T:
     """Загружает JSON-данные из файла.
 
+    Файлы с расширением .gz прозрачно распаковываются.
+
     Args:
         path: Путь к файлу.
         default (Callable): Функция, возвращающая значение по умолчанию.
@@ -15,23 +111,43 @@ def load_json(path, default: Callable[[], T] = list) -> T:
     Returns:
         T: Загруженные данные или значение по умолчанию.
     """
-    path = Path(path)
     try:
-        with path.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return decode_json(read_json_bytes(path))
+    except (ValueError, EOFError, OSError):
         return default()
 
 
 def save_json(path, data):
     """Сохраняет данные в JSON-файл.
 
+    Формат задается настройкой json_codec (см. encode_json); файлы с
+    расширением .gz прозрачно сжимаются. Данные пишутся во временный файл,
+    который затем атомарно заменяет path, поэтому прерванная запись
+    (например, при выходе процесса) не оставляет обрезанный файл.
+
     Args:
         path: Путь к файлу.
         data: Данные для сохранения.
     """
+    write_json_bytes(path, encode_json(data))
+
+
+def write_json_bytes(path, payload: bytes) -> None:
+    """Атомарно записывает уже закодированный JSON-документ (см. save_json).
+
+    Args:
+        path: Путь к файлу.
+        payload (bytes): Документ в кодировке UTF-8.
+    """
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    opener = gzip.open if _is_gzip(path) else open
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with opener(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,208 @@
+import copy
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from valutatrade_hub.core.utils import load_json, save_json
+from valutatrade_hub.infra.cache import JsonDocumentCache
+from valutatrade_hub.infra.indexes import JsonListIndex
+
+
+class StorageBackend(ABC):
+    """Базовый интерфейс хранилища пользователей и портфелей.
+
+    Помимо загрузки и сохранения коллекций целиком, бэкенд предоставляет
+    точечные операции над одной записью, которыми пользуются usecases.
+    """
+
+    @abstractmethod
+    def load_users(self) -> list[dict]:
+        """Возвращает список всех пользователей."""
+
+    @abstractmethod
+    def save_users(self, users: list[dict]) -> None:
+        """Полностью заменяет список пользователей."""
+
+    @abstractmethod
+    def load_portfolios(self) -> list[dict]:
+        """Возвращает список всех портфелей."""
+
+    @abstractmethod
+    def save_portfolios(self, portfolios: list[dict]) -> None:
+        """Полностью заменяет список портфелей."""
+
+    @abstractmethod
+    def get_user(self, user_id: int) -> dict | None:
+        """Возвращает пользователя по id или None, если он не найден."""
+
+    @abstractmethod
+    def find_user(self, username: str) -> dict | None:
+        """Возвращает пользователя по имени или None, если он не найден."""
+
+    @abstractmethod
+    def next_user_id(self) -> int:
+        """Возвращает id для следующего регистрируемого пользователя."""
+
+    @abstractmethod
+    def add_user(self, user: dict) -> None:
+        """Добавляет нового пользователя.
+
+        Raises:
+            ValueError: Если имя пользователя или id уже заняты.
+        """
+
+    def create_user(self, user: dict) -> int:
+        """Регистрирует пользователя вместе с пустым портфелем.
+
+        user_id в записи предварительный (см. next_user_id): хранилище,
+        умеющее выдавать id атомарно, назначает свой.
+
+        Raises:
+            ValueError: Если имя пользователя или id уже заняты.
+
+        Returns:
+            int: Итоговый id пользователя.
+        """
+        self.add_user(user)
+        user_id = int(user["user_id"])
+        self.save_portfolio({"user_id": user_id, "wallets": {}})
+        return user_id
+
+    @abstractmethod
+    def load_portfolio(self, user_id: int) -> dict | None:
+        """Возвращает портфель пользователя или None, если он не найден."""
+
+    @abstractmethod
+    def save_portfolio(self, portfolio: dict) -> None:
+        """Создает или полностью заменяет портфель пользователя."""
+
+    @abstractmethod
+    def save_wallet(self, user_id: int, currency_code: str, balance: float) -> None:
+        """Устанавливает баланс одного кошелька в портфеле пользователя."""
+
+
+class JsonStorageBackend(StorageBackend):
+    """Хранилище в JSON-файлах.
+
+    Без кэша каждая операция перечитывает файл целиком; с кэшем файл
+    разбирается повторно, только если он изменился на диске. Поиск
+    пользователя и портфеля, а также выдача нового id идут через
+    постоянные индексы users.idx.json и portfolios.idx.json.
+    """
+
+    def __init__(
+        self,
+        users_path: Path,
+        portfolios_path: Path,
+        cache: JsonDocumentCache | None = None,
+    ) -> None:
+        self.users_path = Path(users_path)
+        self.portfolios_path = Path(portfolios_path)
+        self._cache = cache
+        self._users_index = JsonListIndex(
+            self.users_path, self._index_path(self.users_path), "username"
+        )
+        self._portfolios_index = JsonListIndex(
+            self.portfolios_path, self._index_path(self.portfolios_path)
+        )
+
+    @staticmethod
+    def _index_path(path: Path) -> Path:
+        return path.with_name(f"{path.stem}.idx.json")
+
+    def _load(self, path: Path, shared: bool = False) -> list[dict]:
+        if self._cache is not None:
+            return self._cache.load(path, default=list, shared=shared)
+        return load_json(path, default=list)
+
+    def _save(self, path: Path, data: list[dict], shared: bool = False) -> None:
+        if self._cache is not None:
+            self._cache.save(path, data, shared=shared)
+        else:
+            save_json(path, data)
+
+    @staticmethod
+    def _lookup(records: list[dict], index: JsonListIndex, user_id: int) -> int | None:
+        position = index.position(user_id)
+        if position is not None and (
+            position >= len(records) or int(records[position]["user_id"]) != user_id
+        ):
+            index.rebuild(records)
+            position = index.position(user_id)
+        return position
+
+    def load_users(self) -> list[dict]:
+        return self._load(self.users_path)
+
+    def save_users(self, users: list[dict]) -> None:
+        self._save(self.users_path, users)
+
+    def load_portfolios(self) -> list[dict]:
+        return self._load(self.portfolios_path)
+
+    def save_portfolios(self, portfolios: list[dict]) -> None:
+        self._save(self.portfolios_path, portfolios)
+
+    def get_user(self, user_id: int) -> dict | None:
+        users = self._load(self.users_path, shared=True)
+        self._users_index.sync(users)
+        position = self._lookup(users, self._users_index, int(user_id))
+        return None if position is None else copy.deepcopy(users[position])
+
+    def find_user(self, username: str) -> dict | None:
+        users = self._load(self.users_path, shared=True)
+        self._users_index.sync(users)
+        user_id = self._users_index.user_id_for(username)
+        if user_id is None:
+            return None
+        position = self._lookup(users, self._users_index, user_id)
+        return None if position is None else copy.deepcopy(users[position])
+
+    def next_user_id(self) -> int:
+        self._users_index.sync(self._load(self.users_path, shared=True))
+        return self._users_index.next_id
+
+    def add_user(self, user: dict) -> None:
+        users = list(self._load(self.users_path, shared=True))
+        self._users_index.sync(users)
+        if self._users_index.user_id_for(user["username"]) is not None:
+            raise ValueError(f"Имя пользователя '{user['username']}' уже занято.")
+        if self._users_index.position(user["user_id"]) is not None:
+            raise ValueError(f"Пользователь с id={user['user_id']} уже существует.")
+        users.append(copy.deepcopy(user))
+        self._save(self.users_path, users, shared=True)
+        self._users_index.record_added(user, len(users) - 1)
+        self._users_index.commit()
+
+    def load_portfolio(self, user_id: int) -> dict | None:
+        portfolios = self._load(self.portfolios_path, shared=True)
+        self._portfolios_index.sync(portfolios)
+        position = self._lookup(portfolios, self._portfolios_index, int(user_id))
+        return None if position is None else copy.deepcopy(portfolios[position])
+
+    def save_portfolio(self, portfolio: dict) -> None:
+        portfolios = list(self._load(self.portfolios_path, shared=True))
+        self._portfolios_index.sync(portfolios)
+        position = self._lookup(
+            portfolios, self._portfolios_index, int(portfolio["user_id"])
+        )
+        if position is None:
+            portfolios.append(copy.deepcopy(portfolio))
+            self._save(self.portfolios_path, portfolios, shared=True)
+            self._portfolios_index.record_added(portfolio, len(portfolios) - 1)
+        else:
+            portfolios[position] = copy.deepcopy(portfolio)
+            self._save(self.portfolios_path, portfolios, shared=True)
+        self._portfolios_index.commit()
+
+    def save_wallet(self, user_id: int, currency_code: str, balance: float) -> None:
+        portfolios = list(self._load(self.portfolios_path, shared=True))
+        self._portfolios_index.sync(portfolios)
+        position = self._lookup(portfolios, self._portfolios_index, int(user_id))
+        if position is None:
+            raise ValueError(f"Портфель пользователя с id={user_id} не найден.")
+        portfolio = portfolios[position]
+        wallets = dict(portfolio.get("wallets", {}))
+        wallets[currency_code] = {"balance": balance}
+        portfolios[position] = {**portfolio, "wallets": wallets}
+        self._save(self.portfolios_path, portfolios, shared=True)
+        self._portfolios_index.commit()
@@ -0,0 +1,136 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from valutatrade_hub.core.utils import (
+    decode_json,
+    encode_json,
+    read_json_bytes,
+    write_json_bytes,
+)
+
+_Stamp = tuple[int, int, int]
+
+
+class _Entry:
+    __slots__ = ("stamp", "raw", "data")
+
+    def __init__(self, stamp: _Stamp, raw: bytes, data: Any = None) -> None:
+        self.stamp = stamp
+        self.raw = raw
+        self.data = data
+
+
+class JsonDocumentCache:
+    """Кэш JSON-документов в памяти процесса.
+
+    Документ перечитывается с диска, только если у файла изменились
+    st_mtime_ns, размер или inode, то есть его записал кто-то другой.
+    После save() кэш обновляется без повторного чтения файла.
+
+    Для каждого файла хранятся байты документа и один общий декодированный
+    объект. load(shared=True) отдает общий объект без копирования: его
+    нельзя изменять ни на какой глубине. Обычный load() заново декодирует
+    сохраненные байты быстрым декодером (см. decode_json), поэтому
+    вызывающий код получает собственный объект и не может испортить кэш,
+    а копировать документ целиком не нужно.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[Path, _Entry] = {}
+
+    @staticmethod
+    def _stamp(path: Path) -> _Stamp | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def load(
+        self, path, default: Callable[[], Any] = list, shared: bool = False
+    ) -> Any:
+        """Возвращает документ из кэша или читает его с диска.
+
+        Args:
+            path: Путь к файлу.
+            default (Callable): Функция, возвращающая значение по умолчанию.
+            shared (bool): Вернуть общий закэшированный объект. Его нельзя
+                изменять ни на какой глубине; возвращать его части наружу
+                можно только копиями.
+
+        Returns:
+            Any: Документ (общий или собственный объект вызывающего).
+        """
+        path = Path(path)
+        stamp = self._stamp(path)
+        if stamp is None:
+            with self._lock:
+                self._entries.pop(path, None)
+            return default()
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.stamp != stamp:
+                entry = None
+            if entry is not None and shared and entry.data is not None:
+                return entry.data
+
+        if entry is None:
+            try:
+                raw = read_json_bytes(path)
+            except (EOFError, OSError):
+                return default()
+            entry = _Entry(stamp, raw)
+            with self._lock:
+                self._entries[path] = entry
+
+        try:
+            data = decode_json(entry.raw)
+        except ValueError:
+            return default()
+        if shared:
+            with self._lock:
+                if entry.data is None:
+                    entry.data = data
+                data = entry.data
+        return data
+
+    def save(self, path, data: Any, shared: bool = False) -> None:
+        """Записывает документ на диск и обновляет кэш.
+
+        Args:
+            path: Путь к файлу.
+            data (Any): Данные для сохранения.
+            shared (bool): Сделать data общим объектом кэша (см. load). После
+                этого data нельзя изменять; без флага общий объект будет
+                декодирован из записанных байтов при следующем load(shared=True).
+        """
+        path = Path(path)
+        payload = encode_json(data)
+        try:
+            write_json_bytes(path, payload)
+        except Exception:
+            self.invalidate(path)
+            raise
+
+        stamp = self._stamp(path)
+        with self._lock:
+            if stamp is None:
+                self._entries.pop(path, None)
+            else:
+                self._entries[path] = _Entry(stamp, payload, data if shared else None)
+
+    def invalidate(self, path=None) -> None:
+        """Сбрасывает кэш для одного файла или целиком.
+
+        Args:
+            path: Путь к файлу; если не указан, кэш очищается полностью.
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(Path(path), None)
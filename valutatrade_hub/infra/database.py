@@ -1,12 +1,21 @@
 from pathlib import Path
 
-from valutatrade_hub.core.utils import load_json, save_json
+from valutatrade_hub.infra.backends import JsonStorageBackend, StorageBackend
+from valutatrade_hub.infra.cache import JsonDocumentCache
+from valutatrade_hub.infra.journal_backend import JournalStorageBackend
 from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.infra.sharded_backend import ShardedStorageBackend
+from valutatrade_hub.infra.sqlite_backend import SqliteStorageBackend
 
 
 class DatabaseManager:
     """
-    Singleton для управления доступом к данным (JSON-хранилище).
+    Singleton для управления доступом к данным.
+
+    Пользователи и портфели хранятся в бэкенде, выбранном настройкой
+    storage_backend ("json", "journal", "sharded" или "sqlite"); кэш курсов
+    всегда лежит в JSON. Разобранные JSON-документы держатся в кэше и
+    перечитываются только при изменении файла на диске.
 
     Реализован через __new__ для простоты и читаемости:
     - Не требует метакласса
@@ -17,6 +26,8 @@ class DatabaseManager:
         _instance (DatabaseManager | None): Единственный экземпляр класса.
         _initialized (bool): Флаг инициализации синглтона.
         _settings (SettingsLoader): Загрузчик настроек приложения.
+        _cache (JsonDocumentCache): Кэш разобранных JSON-документов.
+        _backend (StorageBackend): Хранилище пользователей и портфелей.
     """
 
     _instance: "DatabaseManager | None" = None
@@ -31,38 +42,125 @@ class DatabaseManager:
         if self._initialized:
             return
         self._settings = SettingsLoader()
+        self._cache = JsonDocumentCache()
+        self._backend = self._create_backend()
         self._initialized = True
 
     def _get_file_path(self, filename: str) -> Path:
         data_dir = Path(self._settings.get("data_dir", "data"))
         return data_dir / filename
 
+    def _create_backend(self) -> StorageBackend:
+        kind = str(self._settings.get("storage_backend", "json")).lower()
+        users_path = self._get_file_path(self._settings.get("users_file", "users.json"))
+        portfolios_path = self._get_file_path(
+            self._settings.get("portfolios_file", "portfolios.json")
+        )
+
+        if kind == "json":
+            return JsonStorageBackend(users_path, portfolios_path, self._cache)
+        if kind == "journal":
+            journal_path = self._get_file_path(
+                self._settings.get("journal_file", "portfolios.journal")
+            )
+            return JournalStorageBackend(
+                users_path,
+                portfolios_path,
+                journal_path,
+                compact_records=int(
+                    self._settings.get("journal_compact_records", 1000)
+                ),
+                cache=self._cache,
+            )
+        if kind == "sharded":
+            return ShardedStorageBackend(
+                users_path,
+                portfolios_path,
+                self._get_file_path(self._settings.get("portfolios_dir", "portfolios")),
+                shard_count=int(self._settings.get("portfolio_shards", 64)),
+                cache=self._cache,
+            )
+        if kind == "sqlite":
+            db_path = self._get_file_path(
+                self._settings.get("sqlite_file", "valutatrade.db")
+            )
+            return SqliteStorageBackend(db_path, users_path, portfolios_path)
+        raise ValueError(f"Unknown storage backend: {kind}")
+
+    @property
+    def backend(self) -> StorageBackend:
+        return self._backend
+
     def load_users(self) -> list[dict]:
-        filename = self._settings.get("users_file", "users.json")
-        path = self._get_file_path(filename)
-        return load_json(path, default=list)
+        return self._backend.load_users()
 
     def save_users(self, users: list[dict]) -> None:
-        filename = self._settings.get("users_file", "users.json")
-        path = self._get_file_path(filename)
-        save_json(path, users)
+        self._backend.save_users(users)
 
     def load_portfolios(self) -> list[dict]:
-        filename = self._settings.get("portfolios_file", "portfolios.json")
-        path = self._get_file_path(filename)
-        return load_json(path, default=list)
+        return self._backend.load_portfolios()
 
     def save_portfolios(self, portfolios: list[dict]) -> None:
-        filename = self._settings.get("portfolios_file", "portfolios.json")
-        path = self._get_file_path(filename)
-        save_json(path, portfolios)
+        self._backend.save_portfolios(portfolios)
+
+    def get_user(self, user_id: int) -> dict | None:
+        return self._backend.get_user(user_id)
+
+    def find_user(self, username: str) -> dict | None:
+        return self._backend.find_user(username)
+
+    def next_user_id(self) -> int:
+        return self._backend.next_user_id()
+
+    def add_user(self, user: dict) -> None:
+        self._backend.add_user(user)
+
+    def create_user(self, user: dict) -> int:
+        return self._backend.create_user(user)
+
+    def load_portfolio(self, user_id: int) -> dict | None:
+        return self._backend.load_portfolio(user_id)
+
+    def save_portfolio(self, portfolio: dict) -> None:
+        self._backend.save_portfolio(portfolio)
+
+    def save_wallet(self, user_id: int, currency_code: str, balance: float) -> None:
+        self._backend.save_wallet(user_id, currency_code, balance)
+
+    @property
+    def rates_path(self) -> Path:
+        return self._get_file_path(self._settings.get("rates_file", "rates.json"))
+
+    @property
+    def rates_lock_path(self) -> Path:
+        """Файл блокировки обновления курсов (rates.json -> rates.json.lock)."""
+        path = self.rates_path
+        return path.with_name(f"{path.name}.lock")
+
+    def load_rates(self, shared: bool = False) -> dict:
+        """Возвращает кэш курсов rates.json.
+
+        Args:
+            shared (bool): Вернуть общий объект кэша документов без
+                декодирования (см. JsonDocumentCache.load); его нельзя
+                изменять.
+        """
+        return self._cache.load(self.rates_path, default=dict, shared=shared)
+
+    @property
+    def rates_checked_path(self) -> Path:
+        """Время опроса источников (rates.json -> rates.checked.json)."""
+        path = self.rates_path
+        return path.with_name(f"{path.stem}.checked.json")
+
+    def load_rates_checked(self) -> dict:
+        """Возвращает время последнего опроса источников курсов.
 
-    def load_rates(self) -> dict:
-        filename = self._settings.get("rates_file", "rates.json")
-        path = self._get_file_path(filename)
-        return load_json(path, default=dict)
+        Returns:
+            dict: {source_name: {"checked_at": ISO}}; общий объект кэша
+                документов, его нельзя изменять.
+        """
+        return self._cache.load(self.rates_checked_path, default=dict, shared=True)
 
     def save_rates(self, rates: dict) -> None:
-        filename = self._settings.get("rates_file", "rates.json")
-        path = self._get_file_path(filename)
-        save_json(path, rates)
+        self._cache.save(self.rates_path, rates)
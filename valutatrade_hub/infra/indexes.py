@@ -0,0 +1,155 @@
+import os
+from pathlib import Path
+
+from valutatrade_hub.core.utils import encode_json, load_json, write_json_bytes
+
+
+class JsonListIndex:
+    """Постоянный индекс для JSON-файла со списком записей пользователей.
+
+    Хранится рядом с файлом данных (users.json -> users.idx.json) и
+    содержит позиции записей по user_id, отображение уникального поля
+    (например, username) в user_id и счетчик следующего id. Индекс
+    привязан к st_mtime_ns и размеру файла данных: если файл изменили в
+    обход индекса, индекс перестраивается одним проходом по записям.
+
+    Привязка хранится в маленьком файле stamp_path (users.idx.stamp) вместе
+    с отметкой самого файла индекса. Индекс перезаписывается, только когда
+    меняется состав записей; после обновления записи на месте (например,
+    кошелька) переписывается лишь stamp_path.
+
+    Attributes:
+        data_path (Path): Путь к индексируемому файлу.
+        index_path (Path): Путь к файлу индекса.
+        stamp_path (Path): Путь к файлу привязки индекса к файлу данных.
+        unique_field (str | None): Поле с уникальным значением или None.
+    """
+
+    def __init__(
+        self, data_path: Path, index_path: Path, unique_field: str | None = None
+    ) -> None:
+        self.data_path = Path(data_path)
+        self.index_path = Path(index_path)
+        self.stamp_path = self.index_path.with_suffix(".stamp")
+        self.unique_field = unique_field
+
+        self._stamp: list[int] | None = None
+        self._index_stamp: list[int] | None = None
+        self._positions: dict[str, int] = {}
+        self._by_unique: dict[str, int] = {}
+        self._next_id = 1
+        self._loaded = False
+        self._dirty = False
+
+    @staticmethod
+    def _file_stamp(path: Path) -> list[int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _data_stamp(self) -> list[int] | None:
+        return self._file_stamp(self.data_path)
+
+    def sync(self, records: list[dict]) -> None:
+        """Проверяет актуальность индекса и при необходимости перестраивает его.
+
+        Args:
+            records (list[dict]): Текущее содержимое файла данных.
+        """
+        stamp = self._data_stamp()
+        if self._loaded and stamp == self._stamp:
+            return
+        self._loaded = True
+        if not self._load_stored(stamp):
+            self.rebuild(records)
+
+    def _load_stored(self, stamp: list[int] | None) -> bool:
+        """Подхватывает индекс, сохраненный для текущего файла данных.
+
+        Если файл данных записал другой процесс, но состав записей не
+        менялся, файл индекса не перечитывается: достаточно stamp_path.
+        """
+        binding = load_json(self.stamp_path, default=dict)
+        if not isinstance(binding, dict) or binding.get("data") != stamp:
+            return False
+        index_stamp = self._file_stamp(self.index_path)
+        if binding.get("index") != index_stamp:
+            return False
+        if index_stamp != self._index_stamp:
+            stored = load_json(self.index_path, default=dict)
+            if not stored:
+                return False
+            self._positions = stored.get("positions", {})
+            self._by_unique = stored.get("by_unique", {})
+            self._next_id = int(stored.get("next_id", 1))
+            self._index_stamp = index_stamp
+        self._stamp = stamp
+        self._dirty = False
+        return True
+
+    def rebuild(self, records: list[dict]) -> None:
+        """Перестраивает индекс по записям и сохраняет его на диск.
+
+        Args:
+            records (list[dict]): Текущее содержимое файла данных.
+        """
+        self._positions = {}
+        self._by_unique = {}
+        max_id = 0
+        for position, record in enumerate(records):
+            user_id = int(record["user_id"])
+            self._positions[str(user_id)] = position
+            if self.unique_field:
+                self._by_unique[str(record[self.unique_field])] = user_id
+            max_id = max(max_id, user_id)
+        self._next_id = max(self._next_id, max_id + 1)
+        self._dirty = True
+        self.commit()
+
+    def _persist(self) -> None:
+        index = {
+            "next_id": self._next_id,
+            "positions": self._positions,
+            "by_unique": self._by_unique,
+        }
+        # Служебный файл: пишется быстрым кодеком независимо от json_codec.
+        write_json_bytes(self.index_path, encode_json(index, "fast"))
+        self._index_stamp = self._file_stamp(self.index_path)
+        self._dirty = False
+
+    def position(self, user_id: int) -> int | None:
+        """Возвращает позицию записи по user_id или None."""
+        return self._positions.get(str(int(user_id)))
+
+    def user_id_for(self, value: str) -> int | None:
+        """Возвращает user_id по значению уникального поля или None."""
+        return self._by_unique.get(str(value))
+
+    @property
+    def next_id(self) -> int:
+        return self._next_id
+
+    def record_added(self, record: dict, position: int) -> None:
+        """Регистрирует запись, добавленную в конец файла данных."""
+        user_id = int(record["user_id"])
+        self._positions[str(user_id)] = position
+        if self.unique_field:
+            self._by_unique[str(record[self.unique_field])] = user_id
+        self._next_id = max(self._next_id, user_id + 1)
+        self._dirty = True
+
+    def commit(self) -> None:
+        """Привязывает индекс к только что записанному файлу данных.
+
+        Файл индекса перезаписывается, только если состав записей
+        изменился (rebuild, record_added). Новая отметка файла данных
+        пишется в stamp_path всегда, иначе другие процессы сочтут индекс
+        устаревшим и будут перестраивать его при каждом открытии.
+        """
+        if self._dirty:
+            self._persist()
+        self._stamp = self._data_stamp()
+        binding = {"data": self._stamp, "index": self._index_stamp}
+        write_json_bytes(self.stamp_path, encode_json(binding, "fast"))
@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from valutatrade_hub.core.utils import load_json, save_json
+from valutatrade_hub.infra.backends import JsonStorageBackend
+from valutatrade_hub.infra.cache import JsonDocumentCache
+from valutatrade_hub.infra.singleflight import file_lock
+
+
+class JournalStorageBackend(JsonStorageBackend):
+    """JSON-хранилище, в котором изменения портфелей пишутся в журнал.
+
+    Каждое изменение кошелька дописывается в журнал одной строкой
+    {"seq", "user_id", "currency", "old", "new"}, поэтому стоимость сделки
+    не зависит от числа пользователей. Снимок portfolios.json
+    перезаписывается только при компактизации, когда в журнале накопилось
+    compact_records записей. Состояние восстанавливается из снимка и
+    журнала; повторное применение записи безопасно, так как в ней хранится
+    итоговый баланс.
+
+    Запись в журнал и компактизация выполняются под межпроцессной
+    блокировкой файла journal_path + ".lock", поэтому компактизация не
+    может потерять запись, дописанную другим процессом. Оборванная
+    последняя строка журнала (сбой во время записи) отрезается перед
+    следующей записью.
+
+    Attributes:
+        journal_path (Path): Путь к файлу журнала.
+        compact_records (int): Число записей журнала, после которого
+            выполняется компактизация.
+    """
+
+    def __init__(
+        self,
+        users_path: Path,
+        portfolios_path: Path,
+        journal_path: Path,
+        compact_records: int = 1000,
+        cache: JsonDocumentCache | None = None,
+    ) -> None:
+        super().__init__(users_path, portfolios_path, cache)
+        self.journal_path = Path(journal_path)
+        self.lock_path = self.journal_path.with_name(self.journal_path.name + ".lock")
+        self.compact_records = max(1, int(compact_records))
+
+        self._lock = threading.RLock()
+        self._state: dict[int, dict[str, float]] = {}
+        self._seq = 0
+        self._journal_records = 0
+        self._journal_offset = 0
+        self._snapshot_stamp: tuple[int, int] | None = None
+        self._rebuild()
+
+    @staticmethod
+    def _stamp(path: Path) -> tuple[int, int] | None:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _rebuild(self) -> None:
+        self._state = {}
+        self._seq = 0
+        self._journal_records = 0
+        self._journal_offset = 0
+        self._snapshot_stamp = self._stamp(self.portfolios_path)
+
+        for portfolio in load_json(self.portfolios_path, default=list):
+            self._state[int(portfolio["user_id"])] = {
+                code: float(info["balance"])
+                for code, info in portfolio.get("wallets", {}).items()
+            }
+        self._replay_journal()
+
+    def _replay_journal(self) -> None:
+        try:
+            with self.journal_path.open("rb") as f:
+                f.seek(self._journal_offset)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        self._journal_offset += len(raw)
+                        continue
+                    self._apply(record)
+                    self._journal_offset += len(raw)
+                    self._journal_records += 1
+        except FileNotFoundError:
+            pass
+
+    def _apply(self, record: dict) -> None:
+        user_id = int(record["user_id"])
+        self._seq = max(self._seq, int(record.get("seq", 0)))
+        if "wallets" in record:
+            self._state[user_id] = {
+                code: float(balance) for code, balance in record["wallets"].items()
+            }
+        else:
+            wallets = self._state.setdefault(user_id, {})
+            wallets[record["currency"]] = float(record["new"])
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        with self._lock, file_lock(self.lock_path):
+            yield
+
+    def _sync(self) -> None:
+        """Подтягивает изменения, сделанные другими процессами."""
+        journal_stamp = self._stamp(self.journal_path)
+        journal_size = journal_stamp[1] if journal_stamp else 0
+        if (
+            self._stamp(self.portfolios_path) != self._snapshot_stamp
+            or journal_size < self._journal_offset
+        ):
+            self._rebuild()
+        elif journal_size > self._journal_offset:
+            self._replay_journal()
+
+    def _append(self, record: dict) -> None:
+        self._seq += 1
+        record = {"seq": self._seq, **record}
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.journal_path.open("ab") as f:
+            # Под блокировкой все, что дальше разобранного смещения, — это
+            # оборванная строка после сбоя; дописывать за ней нельзя.
+            if f.tell() > self._journal_offset:
+                f.truncate(self._journal_offset)
+            data = line.encode("utf-8")
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._apply(record)
+        self._journal_offset += len(data)
+        self._journal_records += 1
+
+        if self._journal_records >= self.compact_records:
+            # Вызывается под _write_lock: повторно брать flock нельзя.
+            self._write_snapshot()
+
+    def _export(self) -> list[dict]:
+        return [
+            {
+                "user_id": user_id,
+                "wallets": {
+                    code: {"balance": balance} for code, balance in wallets.items()
+                },
+            }
+            for user_id, wallets in self._state.items()
+        ]
+
+    def _write_snapshot(self) -> None:
+        tmp_path = self.portfolios_path.with_name(self.portfolios_path.name + ".tmp")
+        save_json(tmp_path, self._export())
+        os.replace(tmp_path, self.portfolios_path)
+        self.journal_path.unlink(missing_ok=True)
+
+        self._snapshot_stamp = self._stamp(self.portfolios_path)
+        self._journal_offset = 0
+        self._journal_records = 0
+
+    def compact(self) -> None:
+        """Переписывает снимок портфелей и очищает журнал."""
+        with self._write_lock():
+            self._sync()
+            self._write_snapshot()
+
+    def load_portfolios(self) -> list[dict]:
+        with self._lock:
+            self._sync()
+            return self._export()
+
+    def save_portfolios(self, portfolios: list[dict]) -> None:
+        with self._write_lock():
+            self._state = {
+                int(p["user_id"]): {
+                    code: float(info["balance"])
+                    for code, info in p.get("wallets", {}).items()
+                }
+                for p in portfolios
+            }
+            self._write_snapshot()
+
+    def load_portfolio(self, user_id: int) -> dict | None:
+        with self._lock:
+            self._sync()
+            wallets = self._state.get(int(user_id))
+            if wallets is None:
+                return None
+            return {
+                "user_id": int(user_id),
+                "wallets": {
+                    code: {"balance": balance} for code, balance in wallets.items()
+                },
+            }
+
+    def save_portfolio(self, portfolio: dict) -> None:
+        with self._write_lock():
+            self._sync()
+            wallets = {
+                code: float(info["balance"])
+                for code, info in portfolio.get("wallets", {}).items()
+            }
+            self._append({"user_id": int(portfolio["user_id"]), "wallets": wallets})
+
+    def save_wallet(self, user_id: int, currency_code: str, balance: float) -> None:
+        with self._write_lock():
+            self._sync()
+            wallets = self._state.get(int(user_id))
+            if wallets is None:
+                raise ValueError(f"Портфель пользователя с id={user_id} не найден.")
+            self._append(
+                {
+                    "user_id": int(user_id),
+                    "currency": currency_code,
+                    "old": wallets.get(currency_code, 0.0),
+                    "new": float(balance),
+                }
+            )
@@ -42,11 +42,21 @@ class SettingsLoader:
             "data_dir": str(project_root / "data"),
             "logs_dir": str(project_root / "logs"),
             "rates_ttl_seconds": 3600,
+            "rates_stale_grace_seconds": 0,
+            "rates_ttl_by_source": {},
+            "rates_ttl_by_class": {},
             "default_base_currency": "USD",
             "users_file": "users.json",
             "portfolios_file": "portfolios.json",
             "rates_file": "rates.json",
             "log_format": "human",
+            "json_codec": "pretty",
+            "storage_backend": "json",
+            "sqlite_file": "valutatrade.db",
+            "journal_file": "portfolios.journal",
+            "journal_compact_records": 1000,
+            "portfolios_dir": "portfolios",
+            "portfolio_shards": 64,
         }
 
         if pyproject_path.exists():
@@ -81,6 +91,18 @@ class SettingsLoader:
     def rates_ttl(self) -> int:
         return int(self.get("rates_ttl_seconds", 3600))
 
+    @property
+    def rates_ttl_by_source(self) -> dict[str, int]:
+        return dict(self.get("rates_ttl_by_source", {}))
+
+    @property
+    def rates_ttl_by_class(self) -> dict[str, int]:
+        return dict(self.get("rates_ttl_by_class", {}))
+
+    @property
+    def rates_stale_grace(self) -> int:
+        return int(self.get("rates_stale_grace_seconds", 0))
+
     @property
     def base_currency(self) -> str:
         return str(self.get("default_base_currency", "USD"))
@@ -0,0 +1,141 @@
+import copy
+from pathlib import Path
+
+from valutatrade_hub.core.utils import load_json, save_json
+from valutatrade_hub.infra.backends import JsonStorageBackend
+from valutatrade_hub.infra.cache import JsonDocumentCache
+
+
+class ShardedStorageBackend(JsonStorageBackend):
+    """JSON-хранилище, в котором портфели разложены по файлам-шардам.
+
+    Портфель пользователя лежит в шарде shard_<user_id % shard_count>.json
+    внутри portfolios_dir, поэтому сделка читает и перезаписывает только
+    один небольшой файл. Пользователи хранятся так же, как в
+    JsonStorageBackend. Если шардов еще нет, а portfolios.json существует,
+    портфели переносятся в шарды при создании хранилища.
+
+    Число шардов записывается в manifest.json каталога шардов. Открыть
+    каталог с другим shard_count нельзя (ValueError): портфели искались бы
+    не в тех шардах, а сохранение создавало бы дубликаты.
+
+    Attributes:
+        portfolios_dir (Path): Каталог с файлами-шардами.
+        shard_count (int): Количество шардов.
+        manifest_path (Path): Путь к манифесту каталога шардов.
+    """
+
+    def __init__(
+        self,
+        users_path: Path,
+        portfolios_path: Path,
+        portfolios_dir: Path,
+        shard_count: int = 64,
+        cache: JsonDocumentCache | None = None,
+    ) -> None:
+        super().__init__(users_path, portfolios_path, cache)
+        self.portfolios_dir = Path(portfolios_dir)
+        self.shard_count = max(1, int(shard_count))
+        self.manifest_path = self.portfolios_dir / "manifest.json"
+
+        self._check_manifest()
+        if self.portfolios_path.exists() and not self._shard_paths():
+            self.migrate_from_file()
+
+    def _check_manifest(self) -> None:
+        """Сверяет shard_count с манифестом и создает манифест, если его нет."""
+        manifest = load_json(self.manifest_path, default=dict)
+        stored = manifest.get("shard_count") if isinstance(manifest, dict) else None
+        if stored is not None:
+            if int(stored) != self.shard_count:
+                raise ValueError(
+                    f"Портфели в {self.portfolios_dir} разложены для "
+                    f"portfolio_shards = {stored}, а в настройках указано "
+                    f"{self.shard_count}. Верните прежнее значение."
+                )
+            return
+
+        # Шарды, созданные до появления манифеста: проверяем раскладку.
+        for path in self._shard_paths():
+            shard_no = int(path.stem.removeprefix("shard_"))
+            if any(
+                int(user_id) % self.shard_count != shard_no
+                for user_id in load_json(path, default=dict)
+            ):
+                raise ValueError(
+                    f"Портфели в {self.portfolios_dir} разложены не для "
+                    f"portfolio_shards = {self.shard_count}. Верните прежнее "
+                    "значение."
+                )
+        save_json(self.manifest_path, {"shard_count": self.shard_count})
+
+    def _shard_paths(self) -> list[Path]:
+        return sorted(self.portfolios_dir.glob("shard_*.json"))
+
+    def _shard_path(self, user_id: int) -> Path:
+        return self.portfolios_dir / f"shard_{int(user_id) % self.shard_count:03d}.json"
+
+    def _load_shard(self, path: Path, shared: bool = False) -> dict:
+        if self._cache is not None:
+            return self._cache.load(path, default=dict, shared=shared)
+        return load_json(path, default=dict)
+
+    def load_portfolios(self) -> list[dict]:
+        portfolios = []
+        for path in self._shard_paths():
+            portfolios.extend(self._load_shard(path).values())
+        return sorted(portfolios, key=lambda p: int(p["user_id"]))
+
+    def save_portfolios(self, portfolios: list[dict]) -> None:
+        shards: dict[Path, dict] = {}
+        for path in self._shard_paths():
+            shards[path] = {}
+        for portfolio in portfolios:
+            user_id = int(portfolio["user_id"])
+            shards.setdefault(self._shard_path(user_id), {})[str(user_id)] = portfolio
+        for path, shard in shards.items():
+            self._save(path, shard)
+
+    def load_portfolio(self, user_id: int) -> dict | None:
+        shard = self._load_shard(self._shard_path(user_id), shared=True)
+        portfolio = shard.get(str(int(user_id)))
+        return None if portfolio is None else copy.deepcopy(portfolio)
+
+    def save_portfolio(self, portfolio: dict) -> None:
+        user_id = int(portfolio["user_id"])
+        path = self._shard_path(user_id)
+        shard = dict(self._load_shard(path, shared=True))
+        shard[str(user_id)] = copy.deepcopy(portfolio)
+        self._save(path, shard, shared=True)
+
+    def save_wallet(self, user_id: int, currency_code: str, balance: float) -> None:
+        path = self._shard_path(user_id)
+        shard = dict(self._load_shard(path, shared=True))
+        portfolio = shard.get(str(int(user_id)))
+        if portfolio is None:
+            raise ValueError(f"Портфель пользователя с id={user_id} не найден.")
+        wallets = dict(portfolio.get("wallets", {}))
+        wallets[currency_code] = {"balance": balance}
+        shard[str(int(user_id))] = {**portfolio, "wallets": wallets}
+        self._save(path, shard, shared=True)
+
+    def migrate_from_file(self, portfolios_path: Path | None = None) -> int:
+        """Раскладывает монолитный portfolios.json по шардам.
+
+        Портфели, уже лежащие в шардах, сохраняются; при совпадении
+        user_id приоритет у данных из шардов. Исходный файл не удаляется.
+
+        Args:
+            portfolios_path (Path | None): Путь к монолитному файлу; по
+                умолчанию portfolios_file из настроек.
+
+        Returns:
+            int: Количество портфелей, записанных в шарды из файла.
+        """
+        source = Path(portfolios_path or self.portfolios_path)
+        legacy = {int(p["user_id"]): p for p in load_json(source, default=list)}
+        existing = {int(p["user_id"]): p for p in self.load_portfolios()}
+        imported = [p for user_id, p in legacy.items() if user_id not in existing]
+        if imported:
+            self.save_portfolios([*existing.values(), *imported])
+        return len(imported)
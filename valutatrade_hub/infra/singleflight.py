@@ -0,0 +1,96 @@
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Hashable, Iterator, TypeVar
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+T = TypeVar("T")
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Берет эксклюзивную межпроцессную блокировку на файле path.
+
+    Используется fcntl.flock; на платформах без fcntl блокировка между
+    процессами не выполняется.
+
+    Args:
+        path (Path): Путь к файлу блокировки (создается при необходимости).
+    """
+    if fcntl is None:
+        yield
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class SingleFlight:
+    """Выполняет операцию не более одного раза одновременно.
+
+    Внутри процесса первый вызывающий запускает операцию, а остальные,
+    пришедшие до ее завершения, ждут общий Future и получают тот же
+    результат или то же исключение. Между процессами операция
+    выполняется под файловой блокировкой. Перед запуском операции
+    вызывается recheck, чтобы не повторять работу, которую только что
+    сделал другой поток или процесс. Вызовы с разными key не
+    объединяются: вызывающий присоединяется только к операции с тем же
+    ключом, то есть с той же работой.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, Future] = {}
+
+    def do(
+        self,
+        fn: Callable[[], T],
+        lock_path: Path | None = None,
+        recheck: Callable[[], bool] | None = None,
+        key: Hashable = None,
+    ) -> T | None:
+        """Выполняет fn или дожидается уже идущего выполнения.
+
+        Args:
+            fn (Callable[[], T]): Операция.
+            lock_path (Path | None): Файл межпроцессной блокировки; None —
+                только внутрипроцессная дедупликация.
+            recheck (Callable[[], bool] | None): Вызывается после
+                получения блокировки; если вернул True, fn не выполняется.
+            key (Hashable): Ключ операции; объединяются только вызовы с
+                одинаковым ключом.
+
+        Returns:
+            T | None: Результат fn или None, если fn не понадобилась.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            with file_lock(lock_path) if lock_path is not None else nullcontext():
+                result = None if recheck is not None and recheck() else fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
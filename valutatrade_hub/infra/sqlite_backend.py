@@ -0,0 +1,242 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+from valutatrade_hub.infra.backends import JsonStorageBackend, StorageBackend
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    hashed_password TEXT NOT NULL,
+    salt TEXT NOT NULL,
+    registration_date TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username);
+CREATE TABLE IF NOT EXISTS portfolios (
+    user_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS wallets (
+    user_id INTEGER NOT NULL,
+    currency_code TEXT NOT NULL,
+    balance REAL NOT NULL,
+    PRIMARY KEY (user_id, currency_code)
+) WITHOUT ROWID;
+"""
+
+_USER_COLUMNS = "user_id, username, hashed_password, salt, registration_date"
+_NEW_USER_COLUMNS = "username, hashed_password, salt, registration_date"
+
+
+def _is_username_conflict(error: sqlite3.IntegrityError) -> bool:
+    return "users.username" in str(error)
+
+
+class SqliteStorageBackend(StorageBackend):
+    """Хранилище пользователей и портфелей в SQLite.
+
+    Пользователи ищутся по первичному ключу user_id и уникальному индексу
+    username, а сделка обновляет ровно одну строку таблицы wallets.
+    При регистрации id выдает сама SQLite, и пользователь с портфелем
+    создаются в одной транзакции. При создании новой базы в нее
+    импортируются существующие JSON-файлы.
+
+    Attributes:
+        db_path (Path): Путь к файлу базы данных.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        users_json: Path | None = None,
+        portfolios_json: Path | None = None,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.db_path.exists()
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        if is_new:
+            self._import_json(users_json, portfolios_json)
+
+    def _import_json(
+        self, users_json: Path | None, portfolios_json: Path | None
+    ) -> None:
+        if users_json is None or portfolios_json is None:
+            return
+        legacy = JsonStorageBackend(users_json, portfolios_json)
+        users = legacy.load_users()
+        portfolios = legacy.load_portfolios()
+        if users:
+            self.save_users(users)
+        if portfolios:
+            self.save_portfolios(portfolios)
+
+    @staticmethod
+    def _user_row(user: dict) -> tuple:
+        return (
+            int(user["user_id"]),
+            user["username"],
+            user["hashed_password"],
+            user["salt"],
+            user["registration_date"],
+        )
+
+    def load_users(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_USER_COLUMNS} FROM users ORDER BY user_id"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_users(self, users: list[dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM users")
+            self._conn.executemany(
+                f"INSERT INTO users ({_USER_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                [self._user_row(u) for u in users],
+            )
+
+    def load_portfolios(self) -> list[dict]:
+        with self._lock:
+            ids = self._conn.execute(
+                "SELECT user_id FROM portfolios ORDER BY user_id"
+            ).fetchall()
+            wallets = self._conn.execute(
+                "SELECT user_id, currency_code, balance FROM wallets"
+            ).fetchall()
+
+        portfolios = {row["user_id"]: {} for row in ids}
+        for row in wallets:
+            portfolios.setdefault(row["user_id"], {})[row["currency_code"]] = {
+                "balance": row["balance"]
+            }
+        return [
+            {"user_id": user_id, "wallets": user_wallets}
+            for user_id, user_wallets in portfolios.items()
+        ]
+
+    def save_portfolios(self, portfolios: list[dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM wallets")
+            self._conn.execute("DELETE FROM portfolios")
+            for portfolio in portfolios:
+                self._write_portfolio(portfolio)
+
+    def get_user(self, user_id: int) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_USER_COLUMNS} FROM users WHERE user_id = ?",
+                (int(user_id),),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find_user(self, username: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_USER_COLUMNS} FROM users WHERE username = ?",
+                (username,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def next_user_id(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(user_id) FROM users").fetchone()
+        return (row[0] or 0) + 1
+
+    def add_user(self, user: dict) -> None:
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    f"INSERT INTO users ({_USER_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                    self._user_row(user),
+                )
+        except sqlite3.IntegrityError as e:
+            if _is_username_conflict(e):
+                raise ValueError(f"Имя пользователя '{user['username']}' уже занято.")
+            if "users.user_id" in str(e):
+                raise ValueError(f"Пользователь с id={user['user_id']} уже существует.")
+            raise
+
+    def create_user(self, user: dict) -> int:
+        try:
+            with self._lock, self._conn:
+                rows = self._conn.execute(
+                    f"INSERT INTO users ({_NEW_USER_COLUMNS}) VALUES (?, ?, ?, ?) "
+                    "RETURNING user_id",
+                    self._user_row(user)[1:],
+                ).fetchall()
+                user_id = int(rows[0][0])
+                self._conn.execute(
+                    "INSERT INTO portfolios (user_id) VALUES (?)", (user_id,)
+                )
+        except sqlite3.IntegrityError as e:
+            if _is_username_conflict(e):
+                raise ValueError(f"Имя пользователя '{user['username']}' уже занято.")
+            raise
+        return user_id
+
+    def load_portfolio(self, user_id: int) -> dict | None:
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM portfolios WHERE user_id = ?", (int(user_id),)
+            ).fetchone()
+            if not exists:
+                return None
+            rows = self._conn.execute(
+                "SELECT currency_code, balance FROM wallets WHERE user_id = ?",
+                (int(user_id),),
+            ).fetchall()
+        return {
+            "user_id": int(user_id),
+            "wallets": {
+                row["currency_code"]: {"balance": row["balance"]} for row in rows
+            },
+        }
+
+    def save_portfolio(self, portfolio: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM wallets WHERE user_id = ?", (int(portfolio["user_id"]),)
+            )
+            self._write_portfolio(portfolio)
+
+    def save_wallet(self, user_id: int, currency_code: str, balance: float) -> None:
+        with self._lock, self._conn:
+            exists = self._conn.execute(
+                "SELECT 1 FROM portfolios WHERE user_id = ?", (int(user_id),)
+            ).fetchone()
+            if not exists:
+                raise ValueError(f"Портфель пользователя с id={user_id} не найден.")
+            self._conn.execute(
+                "INSERT INTO wallets (user_id, currency_code, balance) "
+                "VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, currency_code) "
+                "DO UPDATE SET balance = excluded.balance",
+                (int(user_id), currency_code, float(balance)),
+            )
+
+    def _write_portfolio(self, portfolio: dict) -> None:
+        user_id = int(portfolio["user_id"])
+        self._conn.execute(
+            "INSERT OR IGNORE INTO portfolios (user_id) VALUES (?)", (user_id,)
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO wallets (user_id, currency_code, balance) "
+            "VALUES (?, ?, ?)",
+            [
+                (user_id, code, float(info["balance"]))
+                for code, info in portfolio.get("wallets", {}).items()
+            ],
+        )
+
+    def close(self) -> None:
+        """Закрывает соединение с базой данных."""
+        with self._lock:
+            self._conn.close()
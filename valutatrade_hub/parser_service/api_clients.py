@@ -1,141 +1,681 @@
+import asyncio
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.logging_config import get_logger
 from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.http_cache import ResponseCache
+from valutatrade_hub.parser_service.ratelimit import TokenBucket
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_connect_timing = threading.local()
+
+
+class _TimedConnectionMixin:
+    """Суммирует время установки соединений (TCP и TLS) в текущем потоке."""
+
+    def connect(self) -> None:
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            elapsed = time.perf_counter() - started
+            _connect_timing.seconds = getattr(_connect_timing, "seconds", 0.0) + elapsed
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter, пул которого замеряет установку новых соединений."""
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def get_http_session(config: ParserConfig) -> requests.Session:
+    """Возвращает общую для процесса HTTP-сессию API-клиентов.
+
+    Сессия создается один раз и держит открытые соединения (keep-alive) в
+    пуле HTTPAdapter, поэтому повторные обновления, в том числе запуски
+    RatesScheduler, не тратят время на новое TCP/TLS-соединение.
+
+    Args:
+        config (ParserConfig): Конфигурация с размерами пула.
+
+    Returns:
+        requests.Session: HTTP-сессия.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = _TimedHTTPAdapter(
+                pool_connections=config.HTTP_POOL_CONNECTIONS,
+                pool_maxsize=config.HTTP_POOL_MAXSIZE,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(
+                {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+            )
+            _session = session
+        return _session
+
+
+def _status_code(error: requests.exceptions.RequestException) -> int | None:
+    return error.response.status_code if error.response is not None else None
+
+
+def _retry_after(response: requests.Response | None) -> float | None:
+    """Разбирает заголовок Retry-After (секунды или HTTP-дата)."""
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    """Результат опроса источника курсов.
+
+    Attributes:
+        rates (dict[str, float]): Курсы в формате {"PAIR_KEY": rate}.
+        not_modified (bool): Курсы взяты из кэша ответов: источник ответил
+            304 или еще не обновил данные.
+        table (dict | None): Полная таблица курсов ({"base", "codes",
+            "rates", "names"}), если клиент ее поддерживает и она включена.
+    """
+
+    rates: dict[str, float]
+    not_modified: bool = False
+    table: dict | None = None
 
 
 class BaseApiClient(ABC):
-    """Базовый абстрактный класс для API-клиентов получения курсов валют."""
+    """Базовый абстрактный класс для API-клиентов получения курсов валют.
+
+    Attributes:
+        source_name (str): Имя источника в кэше курсов и настройках TTL.
+        currency_class (str): Класс валют источника ("crypto" или "fiat").
+        config (ParserConfig): Конфигурация Parser Service.
+        session (requests.Session): HTTP-сессия (по умолчанию общая).
+        last_timings (dict[str, float]): Время последнего запроса, мс:
+            "connect" (установка TCP/TLS-соединения; 0, если соединение
+            взято из пула), "wait" (от отправки запроса до заголовков
+            ответа) и "transfer" (получение тела ответа).
+        response_cache (ResponseCache | None): Дисковый кэш ответов для
+            условных запросов или None, если он отключен.
+        rate_limiter (TokenBucket | None): Ограничитель частоты запросов;
+            каждый HTTP-запрос расходует один жетон.
+    """
+
+    source_name: str
+    currency_class: str
+
+    def __init__(
+        self,
+        config: ParserConfig,
+        session: requests.Session | None = None,
+        response_cache: ResponseCache | None = None,
+    ):
+        self.config = config
+        self.session = session or get_http_session(config)
+        self.last_timings: dict[str, float] = {}
+        if response_cache is None and config.RESPONSE_CACHE_DIR:
+            response_cache = ResponseCache(
+                config.RESPONSE_CACHE_DIR, secrets=self._secrets()
+            )
+        self.response_cache = response_cache
+        self.rate_limiter: TokenBucket | None = None
+
+    @property
+    def name(self) -> str:
+        """Имя клиента для логов и отчета об обновлении."""
+        return self.__class__.__name__
+
+    def _secrets(self) -> tuple[str, ...]:
+        """Секреты из URL запросов, которые не должны попадать в кэш ответов."""
+        return ()
+
+    def _get(
+        self, url: str, params: dict | None = None, conditional: bool = False
+    ) -> requests.Response:
+        """Выполняет GET-запрос через сессию и замеряет его этапы.
+
+        Установка соединения замеряется отдельно пулом сессии
+        get_http_session: если в пуле нашлось открытое соединение, "connect"
+        равно нулю, и в логе видно, что оно переиспользовано, поэтому
+        холодное TCP/TLS-соединение не путается с медленным ответом
+        сервера. При conditional=True
+        запрос отправляется с If-None-Match/If-Modified-Since из кэша
+        ответов.
+
+        Raises:
+            ProviderUnavailableError: Если у источника закончилась квота
+                запросов (см. rate_limiter).
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        headers = None
+        if conditional and self.response_cache is not None:
+            headers = self.response_cache.conditional_headers(url, params)
+
+        _connect_timing.seconds = 0.0
+        started = time.perf_counter()
+        response = self.session.get(
+            url,
+            params=params,
+            headers=headers,
+            timeout=self.config.REQUEST_TIMEOUT,
+            stream=True,
+        )
+        headers_at = time.perf_counter()
+        body_size = len(response.content)
+        finished = time.perf_counter()
+
+        connect = _connect_timing.seconds
+
+        self.last_timings = {
+            "connect": connect * 1000,
+            "wait": (headers_at - started - connect) * 1000,
+            "transfer": (finished - headers_at) * 1000,
+        }
+        if connect:
+            connection = f"connect {self.last_timings['connect']:.1f} ms"
+        else:
+            connection = "connection reused"
+        get_logger().info(
+            f"{self.__class__.__name__} HTTP {response.status_code}: "
+            f"{connection}, wait {self.last_timings['wait']:.1f} ms, "
+            f"transfer {self.last_timings['transfer']:.1f} ms ({body_size} bytes)"
+        )
+        return response
+
+    def _request_args(self) -> tuple[str, dict | None] | None:
+        """Возвращает URL и параметры запроса курсов для кэша ответов.
+
+        Returns:
+            tuple[str, dict | None] | None: URL и параметры или None, если
+                клиент не использует кэш ответов.
+        """
+        return None
+
+    def _request_batches(self) -> list[tuple[str, dict | None]]:
+        """Возвращает запросы, из ответов которых складываются курсы.
+
+        По умолчанию это один запрос из _request_args; клиенты, которые
+        разбивают запрос на части, возвращают несколько, и их ответы
+        объединяются в один словарь.
+        """
+        request_args = self._request_args()
+        return [] if request_args is None else [request_args]
 
     @abstractmethod
-    def fetch_rates(self) -> dict:
-        """Получает курсы валют из внешнего API.
+    def _parse_rates(self, data: dict) -> dict:
+        """Извлекает курсы из тела ответа API.
 
         Raises:
-            ApiRequestError: При ошибке запроса или парсинга.
+            ApiRequestError: Если источник вернул ошибку.
 
         Returns:
             dict: Словарь с курсами в формате {"PAIR_KEY": rate}.
         """
         pass
 
+    def _parse_table(self, data: dict) -> dict | None:
+        """Извлекает полную таблицу курсов из тела ответа API.
 
-class CoinGeckoClient(BaseApiClient):
-    """Клиент для получения курсов криптовалют из CoinGecko API."""
+        Returns:
+            dict | None: Таблица {"base", "codes", "rates", "names"} или
+                None, если клиент ее не поддерживает.
+        """
+        return None
 
-    def __init__(self, config: ParserConfig):
-        self.config = config
+    def _result(self, data: dict, not_modified: bool) -> FetchResult:
+        """Собирает результат опроса из тела ответа."""
+        return FetchResult(
+            self._parse_rates(data), not_modified, self._parse_table(data)
+        )
+
+    def _response_json(
+        self, response: requests.Response, url: str, params: dict | None = None
+    ) -> dict:
+        """Возвращает тело ответа; для 304 — тело сохраненного ответа."""
+        if response.status_code == 304 and self.response_cache is not None:
+            entry = self.response_cache.load(url, params)
+            if entry is not None:
+                return entry["body"]
+        return response.json()
+
+    def _remember(
+        self,
+        response: requests.Response,
+        url: str,
+        params: dict | None,
+        data: dict,
+        next_update: float | None = None,
+    ) -> None:
+        if self.response_cache is not None and response.status_code == 200:
+            self.response_cache.store(url, params, response, data, next_update)
+
+    def cached_rates(self) -> FetchResult | None:
+        """Возвращает курсы из кэша ответов, если источник еще не обновил данные.
+
+        HTTP-запрос не выполняется. Курсы возвращаются, только если время
+        следующего обновления, объявленное источником, еще не наступило.
+
+        Returns:
+            FetchResult | None: Результат с not_modified=True или None, если
+                нужен запрос к API.
+        """
+        batches = self._request_batches()
+        if not batches or self.response_cache is None:
+            return None
+        data = {}
+        for url, params in batches:
+            body = self.response_cache.fresh(url, params)
+            if not isinstance(body, dict):
+                return None
+            data.update(body)
+        try:
+            result = self._result(data, not_modified=True)
+        except (ApiRequestError, KeyError, TypeError, ValueError):
+            return None
+        get_logger().info(f"{self.name}: source not updated yet, using cached response")
+        return result
 
-    def fetch_rates(self) -> dict:
-        """Получает курсы криптовалют относительно USD из CoinGecko.
+    @abstractmethod
+    def fetch_rates(self) -> FetchResult:
+        """Получает курсы валют из внешнего API.
 
         Raises:
-            ApiRequestError: При ошибке сетевого запроса или парсинга ответа.
+            ApiRequestError: При ошибке запроса или парсинга.
 
         Returns:
-            dict: Курсы в формате {"BTC_USD": 59337.21, ...}.
+            FetchResult: Курсы в формате {"PAIR_KEY": rate} и сведения об
+                ответе источника.
         """
-        crypto_ids = ",".join(
-            self.config.CRYPTO_ID_MAP[code] for code in self.config.CRYPTO_CURRENCIES
-        )
+        pass
+
+    async def fetch_rates_async(self, executor: Executor | None = None) -> FetchResult:
+        """Асинхронный вариант fetch_rates.
+
+        По умолчанию синхронный fetch_rates выполняется в отдельном потоке;
+        клиенты с асинхронным HTTP-стеком могут переопределить этот метод.
 
+        Args:
+            executor (Executor | None): Пул для синхронного fetch_rates; по
+                умолчанию пул цикла событий. Отмена ожидания не прерывает
+                поток, поэтому вызывающему коду, который ограничивает время,
+                нужен собственный пул, закрываемый без ожидания.
+
+        Raises:
+            ApiRequestError: При ошибке запроса или парсинга.
+
+        Returns:
+            FetchResult: Результат опроса (как у fetch_rates).
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.fetch_rates)
+
+
+class CoinGeckoClient(BaseApiClient):
+    """Клиент для получения курсов криптовалют из CoinGecko API.
+
+    Идентификаторы монет делятся на пакеты не длиннее
+    COINGECKO_MAX_IDS_PER_REQUEST идентификаторов и COINGECKO_MAX_URL_LENGTH
+    символов URL. Пакеты запрашиваются одновременно (не более
+    COINGECKO_BATCH_WORKERS потоков), каждый расходует жетон ограничителя
+    частоты, а ответы объединяются. Цены запрашиваются сразу во всех
+    COINGECKO_VS_CURRENCIES, поэтому кросс-курсы криптовалют к этим
+    валютам приходят за один запрос, а не выводятся через USD.
+    """
+
+    source_name = "coingecko"
+    currency_class = "crypto"
+
+    def _request_batches(self) -> list[tuple[str, dict]]:
         url = self.config.COINGECKO_URL
-        params = {"ids": crypto_ids, "vs_currencies": self.config.BASE_CURRENCY.lower()}
+        vs_currencies = ",".join(
+            code.lower() for code in self.config.COINGECKO_VS_CURRENCIES
+        )
+        ids = [
+            self.config.CRYPTO_ID_MAP[code] for code in self.config.CRYPTO_CURRENCIES
+        ]
+
+        def request_length(batch: list[str]) -> int:
+            query = urlencode({"ids": ",".join(batch), "vs_currencies": vs_currencies})
+            return len(url) + 1 + len(query)
+
+        batches: list[list[str]] = []
+        current: list[str] = []
+        for crypto_id in ids:
+            candidate = current + [crypto_id]
+            if current and (
+                len(candidate) > self.config.COINGECKO_MAX_IDS_PER_REQUEST
+                or request_length(candidate) > self.config.COINGECKO_MAX_URL_LENGTH
+            ):
+                batches.append(current)
+                candidate = [crypto_id]
+            current = candidate
+        if current:
+            batches.append(current)
+
+        return [
+            (url, {"ids": ",".join(batch), "vs_currencies": vs_currencies})
+            for batch in batches
+        ]
+
+    def _parse_rates(self, data: dict) -> dict:
+        result = {}
+
+        for code, crypto_id in self.config.CRYPTO_ID_MAP.items():
+            prices = data.get(crypto_id)
+            if not prices:
+                continue
+            for vs_code in self.config.COINGECKO_VS_CURRENCIES:
+                if vs_code.lower() in prices:
+                    result[f"{code}_{vs_code.upper()}"] = prices[vs_code.lower()]
+
+        return result
+
+    def _fetch_batch(self, url: str, params: dict) -> tuple[dict, bool]:
+        """Запрашивает один пакет монет.
+
+        Raises:
+            ApiRequestError: При ошибке сетевого запроса или парсинга ответа.
 
+        Returns:
+            tuple[dict, bool]: Тело ответа и признак ответа 304.
+        """
         try:
-            response = requests.get(
-                url, params=params, timeout=self.config.REQUEST_TIMEOUT
-            )
+            response = self._get(url, params=params, conditional=True)
             if response.status_code == 429:
                 raise ApiRequestError(
-                    "CoinGecko: Rate limit exceeded (429). Please try again later."
+                    "CoinGecko: Rate limit exceeded (429). Please try again later.",
+                    status_code=429,
+                    retry_after=_retry_after(response),
                 )
             elif response.status_code == 401:
                 raise ApiRequestError(
-                    "CoinGecko: Unauthorized (401). Check your API key."
+                    "CoinGecko: Unauthorized (401). Check your API key.",
+                    status_code=401,
                 )
             elif response.status_code == 403:
                 raise ApiRequestError(
-                    "CoinGecko: Access forbidden (403). API key may be invalid."
+                    "CoinGecko: Access forbidden (403). API key may be invalid.",
+                    status_code=403,
                 )
             response.raise_for_status()
-            data = response.json()
+            data = self._response_json(response, url, params)
+            if not isinstance(data, dict):
+                raise ValueError("unexpected response format")
+            self._remember(response, url, params, data)
+            return data, response.status_code == 304
 
-            result = {}
-            base_lower = self.config.BASE_CURRENCY.lower()
+        except requests.exceptions.RequestException as e:
+            raise ApiRequestError(
+                f"CoinGecko request failed: {str(e)}",
+                status_code=_status_code(e),
+                retry_after=_retry_after(e.response),
+            ) from e
+        except (KeyError, ValueError) as e:
+            raise ApiRequestError(f"CoinGecko response parsing failed: {str(e)}")
 
-            for code, crypto_id in self.config.CRYPTO_ID_MAP.items():
-                if crypto_id in data and base_lower in data[crypto_id]:
-                    pair_key = f"{code}_{self.config.BASE_CURRENCY}"
-                    result[pair_key] = data[crypto_id][base_lower]
+    def fetch_rates(self) -> FetchResult:
+        """Получает курсы криптовалют из CoinGecko.
 
-            return result
+        Если часть пакетов завершилась ошибкой, возвращаются курсы
+        остальных; ошибка выбрасывается, только если не ответил ни один.
 
-        except requests.exceptions.RequestException as e:
-            raise ApiRequestError(f"CoinGecko request failed: {str(e)}")
-        except (KeyError, ValueError) as e:
+        Raises:
+            ApiRequestError: При ошибке сетевого запроса или парсинга ответа.
+
+        Returns:
+            FetchResult: Курсы в формате {"BTC_USD": 59337.21, "BTC_EUR": ...};
+                not_modified — все пакеты получили ответ 304.
+        """
+        cached = self.cached_rates()
+        if cached is not None:
+            return cached
+        batches = self._request_batches()
+        if not batches:
+            return FetchResult({})
+
+        if len(batches) == 1:
+            outcomes = [self._try_fetch_batch(*batches[0])]
+        else:
+            workers = min(self.config.COINGECKO_BATCH_WORKERS, len(batches))
+            with ThreadPoolExecutor(
+                max_workers=max(1, workers), thread_name_prefix="coingecko-batch"
+            ) as executor:
+                outcomes = list(
+                    executor.map(lambda batch: self._try_fetch_batch(*batch), batches)
+                )
+
+        data = {}
+        unchanged = []
+        errors = []
+        for outcome in outcomes:
+            if isinstance(outcome, ApiRequestError):
+                errors.append(outcome)
+            else:
+                data.update(outcome[0])
+                unchanged.append(outcome[1])
+        if not unchanged:
+            raise errors[0]
+        if errors:
+            get_logger().warning(
+                f"CoinGecko: {len(errors)} of {len(batches)} batches failed: "
+                f"{errors[0].reason}"
+            )
+
+        try:
+            return self._result(data, all(unchanged))
+        except (KeyError, TypeError, ValueError) as e:
             raise ApiRequestError(f"CoinGecko response parsing failed: {str(e)}")
 
+    def _try_fetch_batch(
+        self, url: str, params: dict
+    ) -> tuple[dict, bool] | ApiRequestError:
+        try:
+            return self._fetch_batch(url, params)
+        except ApiRequestError as e:
+            return e
+
 
 class ExchangeRateApiClient(BaseApiClient):
-    """Клиент для получения курсов фиатных валют из ExchangeRate-API."""
+    """Клиент для получения курсов фиатных валют из ExchangeRate-API.
 
-    def __init__(self, config: ParserConfig):
-        self.config = config
+    На бесплатных тарифах курсы обновляются раз в сутки; ответ кэшируется
+    до time_next_update_unix, и до этого момента запрос не выполняется.
+
+    Ответ содержит курсы всех валют ExchangeRate-API (около 160). При
+    EXCHANGERATE_FULL_TABLE вся таблица из того же ответа возвращается в
+    FetchResult.table, а названия валют берутся из /codes (запрашивается не чаще
+    раза в CURRENCY_NAMES_TTL секунд).
+    """
+
+    source_name = "exchangerate"
+    currency_class = "fiat"
+
+    def _secrets(self) -> tuple[str, ...]:
+        return (self.config.EXCHANGERATE_API_KEY,)
+
+    def _request_args(self) -> tuple[str, None]:
+        url = (
+            f"{self.config.EXCHANGERATE_API_URL}/"
+            f"{self.config.EXCHANGERATE_API_KEY}/"
+            f"latest/{self.config.BASE_CURRENCY}"
+        )
+        return url, None
+
+    def _codes_url(self) -> str:
+        return (
+            f"{self.config.EXCHANGERATE_API_URL}/"
+            f"{self.config.EXCHANGERATE_API_KEY}/codes"
+        )
 
-    def fetch_rates(self) -> dict:
+    def _currency_names(self) -> dict[str, str]:
+        """Возвращает сохраненные названия валют без запроса к API."""
+        if self.response_cache is None:
+            return {}
+        entry = self.response_cache.load(self._codes_url())
+        if entry is None:
+            return {}
+        codes = entry["body"].get("supported_codes") or []
+        return {
+            item[0]: item[1]
+            for item in codes
+            if isinstance(item, list) and len(item) == 2
+        }
+
+    def _refresh_currency_names(self) -> None:
+        """Загружает названия валют из /codes, если сохраненные устарели.
+
+        Ошибки не прерывают обновление курсов: без названий валюты
+        регистрируются под своими кодами.
+        """
+        url = self._codes_url()
+        if self.response_cache is None or self.response_cache.fresh(url):
+            return
+        try:
+            response = self._get(url, conditional=True)
+            response.raise_for_status()
+            data = self._response_json(response, url)
+            if data.get("result") != "success":
+                return
+            self._remember(
+                response, url, None, data, time.time() + self.config.CURRENCY_NAMES_TTL
+            )
+        except (requests.exceptions.RequestException, ApiRequestError, ValueError) as e:
+            get_logger().warning(f"ExchangeRate-API currency names failed: {e}")
+
+    def _parse_rates(self, data: dict) -> dict:
+        if data.get("result") != "success":
+            error_type = data.get("error-type", "unknown")
+            raise ApiRequestError(f"ExchangeRate-API returned error: {error_type}")
+
+        rates = data.get("conversion_rates", {})
+        result = {}
+
+        for code in self.config.FIAT_CURRENCIES:
+            if code in rates:
+                pair_key = f"{code}_{self.config.BASE_CURRENCY}"
+                result[pair_key] = 1.0 / rates[code]
+
+        return result
+
+    def _parse_table(self, data: dict) -> dict | None:
+        if not self.config.EXCHANGERATE_FULL_TABLE:
+            return None
+        rates = data.get("conversion_rates", {})
+        names = self._currency_names()
+        codes = [
+            code
+            for code, rate in rates.items()
+            if isinstance(rate, (int, float)) and rate > 0
+        ]
+        return {
+            "base": data.get("base_code", self.config.BASE_CURRENCY),
+            "codes": codes,
+            "rates": [float(rates[code]) for code in codes],
+            "names": [names.get(code, "") for code in codes],
+        }
+
+    def fetch_rates(self) -> FetchResult:
         """Получает курсы фиатных валют относительно USD.
 
         Raises:
             ApiRequestError: При отсутствии API-ключа или ошибке запроса.
 
         Returns:
-            dict: Курсы в формате {"EUR_USD": 0.927, ...}.
+            FetchResult: Курсы в формате {"EUR_USD": 0.927, ...} и, при
+                EXCHANGERATE_FULL_TABLE, полная таблица курсов.
         """
         if not self.config.EXCHANGERATE_API_KEY:
             raise ApiRequestError("EXCHANGERATE_API_KEY is not set")
 
-        url = (
-            f"{self.config.EXCHANGERATE_API_URL}/"
-            f"{self.config.EXCHANGERATE_API_KEY}/"
-            f"latest/{self.config.BASE_CURRENCY}"
-        )
+        cached = self.cached_rates()
+        if cached is not None:
+            return cached
+        url, params = self._request_args()
+        if self.config.EXCHANGERATE_FULL_TABLE:
+            self._refresh_currency_names()
 
         try:
-            response = requests.get(url, timeout=self.config.REQUEST_TIMEOUT)
+            response = self._get(url, params=params, conditional=True)
             if response.status_code == 429:
                 raise ApiRequestError(
                     "ExchangeRate-API: Rate limit exceeded (429). "
-                    "Please try again later."
+                    "Please try again later.",
+                    status_code=429,
+                    retry_after=_retry_after(response),
                 )
             elif response.status_code == 401:
                 raise ApiRequestError(
-                    "ExchangeRate-API: Unauthorized (401). Check your API key."
+                    "ExchangeRate-API: Unauthorized (401). Check your API key.",
+                    status_code=401,
                 )
             elif response.status_code == 403:
                 raise ApiRequestError(
-                    "ExchangeRate-API: Access forbidden (403). API key may be invalid."
+                    "ExchangeRate-API: Access forbidden (403). API key may be invalid.",
+                    status_code=403,
                 )
             response.raise_for_status()
-            data = response.json()
-
-            if data.get("result") != "success":
-                error_type = data.get("error-type", "unknown")
-                raise ApiRequestError(f"ExchangeRate-API returned error: {error_type}")
-
-            rates = data.get("conversion_rates", {})
-            result = {}
-
-            for code in self.config.FIAT_CURRENCIES:
-                if code in rates:
-                    pair_key = f"{code}_{self.config.BASE_CURRENCY}"
-                    result[pair_key] = 1.0 / rates[code]
-
+            data = self._response_json(response, url, params)
+            result = self._result(data, response.status_code == 304)
+            self._remember(
+                response, url, params, data, data.get("time_next_update_unix")
+            )
             return result
 
         except requests.exceptions.RequestException as e:
-            raise ApiRequestError(f"ExchangeRate-API request failed: {str(e)}")
+            raise ApiRequestError(
+                f"ExchangeRate-API request failed: {str(e)}",
+                status_code=_status_code(e),
+                retry_after=_retry_after(e.response),
+            ) from e
         except (KeyError, ValueError) as e:
             raise ApiRequestError(f"ExchangeRate-API response parsing failed: {str(e)}")
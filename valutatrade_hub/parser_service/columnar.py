@@ -0,0 +1,269 @@
+import bisect
+import mmap
+import os
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from valutatrade_hub.core.utils import load_json, save_json
+from valutatrade_hub.parser_service.history import (
+    HistoryFile,
+    HistoryIndex,
+    parse_timestamp,
+)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_COLUMNS = {"ts": "q", "rate": "d", "src": "H"}
+
+
+def _to_micros(value: str | datetime) -> int:
+    delta = parse_timestamp(value) - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(value: int) -> str:
+    return (_EPOCH + timedelta(microseconds=value)).isoformat().replace("+00:00", "Z")
+
+
+class _PairColumns:
+    """Отображенные в память колонки одной пары (только чтение).
+
+    Видны только rows зафиксированных строк; если rows равно None (история
+    записана до появления счетчика), берется длина самой короткой колонки.
+    """
+
+    def __init__(self, base: Path, stamp: Any, rows: int | None):
+        self.stamp = stamp
+        views = {}
+        for column, typecode in _COLUMNS.items():
+            path = base.with_name(f"{base.name}.{column}.bin")
+            views[column] = self._map(path, array(typecode).itemsize).cast(typecode)
+        size = min(len(v) for v in views.values())
+        if rows is not None:
+            size = min(size, rows)
+        self.ts = views["ts"][:size]
+        self.rate = views["rate"][:size]
+        self.src = views["src"][:size]
+
+    def _map(self, path: Path, itemsize: int) -> memoryview:
+        try:
+            with path.open("rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return memoryview(b"")
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return memoryview(b"")
+        # Хвост от прерванной записи отбрасывается.
+        usable = len(mm) - len(mm) % itemsize
+        return memoryview(mm)[:usable]
+
+
+class ColumnarHistoryFile(HistoryFile):
+    """Колоночная история: по три бинарных массива на каждую пару.
+
+    Для пары BTC_USD в каталоге path лежат BTC_USD.ts.bin (array('q'),
+    время в микросекундах от эпохи), BTC_USD.rate.bin (array('d'), курс) и
+    BTC_USD.src.bin (array('H'), номер источника из sources.json). Массивы
+    пишутся в машинном порядке байт и при чтении отображаются в память,
+    поэтому запросы за интервал и расчеты идут по непрерывным буферам, а
+    запись истории занимает 18 байт вместо сотен байт JSON.
+
+    Число зафиксированных строк пары хранится в BTC_USD.rows.json и
+    обновляется последним, после записи всех трех колонок. Читатели видят
+    только зафиксированные строки, а перед следующей записью колонки
+    обрезаются до этого числа, поэтому сбой посреди записи не сдвигает
+    колонки друг относительно друга.
+
+    Attributes:
+        path (Path): Каталог с колонками.
+    """
+
+    def __init__(self, path: str | Path):
+        super().__init__(path)
+        self._sources_path = self.path / "sources.json"
+        self._columns: dict[str, _PairColumns] = {}
+
+    def _base(self, pair_key: str) -> Path:
+        return self.path / pair_key
+
+    def pairs(self) -> list[str]:
+        """Возвращает ключи пар, для которых есть колонки."""
+        if not self.path.is_dir():
+            return []
+        return sorted(p.name[: -len(".ts.bin")] for p in self.path.glob("*.ts.bin"))
+
+    def _rows_path(self, pair_key: str) -> Path:
+        return self.path / f"{pair_key}.rows.json"
+
+    def _committed_rows(self, pair_key: str) -> int | None:
+        rows = load_json(self._rows_path(pair_key), default=lambda: None)
+        return rows if isinstance(rows, int) else None
+
+    def _pair_stamp(self, pair_key: str) -> list[int] | None:
+        for name in (f"{pair_key}.rows.json", f"{pair_key}.ts.bin"):
+            try:
+                stat = os.stat(self.path / name)
+            except OSError:
+                continue
+            return [stat.st_mtime_ns, stat.st_size]
+        return None
+
+    def stamp(self) -> list | None:
+        stamps = [[pair, self._pair_stamp(pair)] for pair in self.pairs()]
+        return stamps or None
+
+    def columns(self, pair_key: str) -> _PairColumns:
+        """Возвращает отображенные в память колонки пары."""
+        stamp = self._pair_stamp(pair_key)
+        cached = self._columns.get(pair_key)
+        if cached is None or cached.stamp != stamp:
+            cached = _PairColumns(
+                self._base(pair_key), stamp, self._committed_rows(pair_key)
+            )
+            self._columns[pair_key] = cached
+        return cached
+
+    def _sources(self) -> list[str]:
+        return load_json(self._sources_path, default=list)
+
+    def append(self, records: list[dict]) -> None:
+        if not records:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        sources = self._sources()
+
+        grouped: dict[str, list[tuple[int, float, int]]] = {}
+        for record in records:
+            source = str(record.get("source", ""))
+            if source not in sources:
+                sources.append(source)
+            pair_key = f"{record['from_currency']}_{record['to_currency']}"
+            grouped.setdefault(pair_key, []).append(
+                (
+                    _to_micros(record["timestamp"]),
+                    float(record["rate"]),
+                    sources.index(source),
+                )
+            )
+        save_json(self._sources_path, sources)
+
+        for pair_key, rows in grouped.items():
+            rows.sort()
+            existing = self.columns(pair_key)
+            committed = len(existing.ts)
+            rewrite = committed > 0 and rows[0][0] < existing.ts[-1]
+            if rewrite:
+                rows = sorted([*zip(existing.ts, existing.rate, existing.src), *rows])
+            self._columns.pop(pair_key, None)
+
+            for i, (column, typecode) in enumerate(_COLUMNS.items()):
+                data = array(typecode, (row[i] for row in rows))
+                path = self._base(pair_key).with_name(f"{pair_key}.{column}.bin")
+                if rewrite:
+                    # Отображенный в память старый файл нельзя обрезать на месте.
+                    tmp_path = path.with_name(f"{path.name}.tmp")
+                    tmp_path.write_bytes(data.tobytes())
+                    os.replace(tmp_path, path)
+                else:
+                    with path.open("ab") as f:
+                        # Отрезаем незафиксированный хвост прерванной записи.
+                        f.truncate(committed * data.itemsize)
+                        f.write(data.tobytes())
+            save_json(
+                self._rows_path(pair_key),
+                len(rows) if rewrite else committed + len(rows),
+            )
+
+    def _record(self, pair_key: str, i: int, sources: list[str]) -> dict:
+        cols = self.columns(pair_key)
+        from_currency, _, to_currency = pair_key.partition("_")
+        timestamp = _from_micros(cols.ts[i])
+        src = cols.src[i]
+        return {
+            "id": f"{pair_key}_{timestamp}",
+            "from_currency": from_currency,
+            "to_currency": to_currency,
+            "rate": cols.rate[i],
+            "timestamp": timestamp,
+            "source": sources[src] if src < len(sources) else "",
+            "meta": {},
+        }
+
+    def iter_records(self) -> Iterator[dict]:
+        for _, record in self.iter_entries():
+            yield record
+
+    def iter_entries(self) -> Iterator[tuple[tuple[str, int], dict]]:
+        sources = self._sources()
+        for pair_key in self.pairs():
+            for i in range(len(self.columns(pair_key).ts)):
+                yield (pair_key, i), self._record(pair_key, i, sources)
+
+    def read_entries(self, locators: Iterable[tuple[str, int]]) -> Iterator[dict]:
+        sources = self._sources()
+        for pair_key, i in locators:
+            yield self._record(pair_key, i, sources)
+
+    def read_pair(
+        self,
+        pair_key: str,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+    ) -> tuple[memoryview, memoryview]:
+        """Возвращает срезы колонок времени и курсов пары за интервал.
+
+        Срезы ссылаются на отображенный в память файл без копирования и
+        подходят для расчетов (min/max/среднее и т.п.) по всему интервалу.
+
+        Args:
+            pair_key (str): Ключ пары, например "BTC_USD".
+            since (str | datetime | None): Начало интервала (включительно).
+            until (str | datetime | None): Конец интервала (включительно).
+
+        Returns:
+            tuple[memoryview, memoryview]: Время (мкс от эпохи) и курсы.
+        """
+        cols = self.columns(pair_key)
+        lo = 0 if since is None else bisect.bisect_left(cols.ts, _to_micros(since))
+        hi = (
+            len(cols.ts)
+            if until is None
+            else bisect.bisect_right(cols.ts, _to_micros(until))
+        )
+        return cols.ts[lo:hi], cols.rate[lo:hi]
+
+    def create_index(self) -> HistoryIndex:
+        return ColumnarHistoryIndex(self)
+
+
+class ColumnarHistoryIndex(HistoryIndex):
+    """Индекс поверх колоночной истории.
+
+    Колонки времени уже отсортированы, поэтому отдельная структура в
+    памяти не строится: поиск интервала идет бинарным поиском прямо по
+    отображенному в память массиву.
+    """
+
+    history: ColumnarHistoryFile
+
+    def pairs(self) -> list[str]:
+        return self.history.pairs()
+
+    def iter_pair(
+        self,
+        pair_key: str,
+        since: float | None = None,
+        until: float | None = None,
+        oldest_first: bool = False,
+    ) -> Iterator[tuple[float, Any]]:
+        ts = self.history.columns(pair_key).ts
+        lo = 0 if since is None else bisect.bisect_left(ts, round(since * 1_000_000))
+        hi = (
+            len(ts)
+            if until is None
+            else bisect.bisect_right(ts, round(until * 1_000_000))
+        )
+        positions = range(lo, hi) if oldest_first else range(hi - 1, lo - 1, -1)
+        for i in positions:
+            yield ts[i] / 1_000_000, (pair_key, i)
@@ -37,6 +37,10 @@ class ParserConfig:
 
     BASE_CURRENCY: str = "USD"
     FIAT_CURRENCIES: tuple = ("EUR", "GBP", "RUB")
+    EXCHANGERATE_FULL_TABLE: bool = os.getenv(
+        "EXCHANGERATE_FULL_TABLE", "false"
+    ).lower() in ("1", "true", "yes")
+    CURRENCY_NAMES_TTL: float = 30 * 86400
     CRYPTO_CURRENCIES: tuple = ("BTC", "ETH", "SOL")
     CRYPTO_ID_MAP: dict[str, str] = field(
         default_factory=lambda: {
@@ -46,16 +50,66 @@ class ParserConfig:
         }
     )
 
+    COINGECKO_VS_CURRENCIES: tuple | None = None
+    COINGECKO_MAX_IDS_PER_REQUEST: int = 100
+    COINGECKO_MAX_URL_LENGTH: int = 2000
+    COINGECKO_BATCH_WORKERS: int = 4
+
     RATES_FILE_PATH: str | None = None
     HISTORY_FILE_PATH: str | None = None
+    HISTORY_FORMAT: str = os.getenv("HISTORY_FORMAT", "json")
+    HISTORY_PARTITION: str = os.getenv("HISTORY_PARTITION", "month")
+    HISTORY_RETENTION_DAYS: int = int(os.getenv("HISTORY_RETENTION_DAYS", "0"))
+    HISTORY_RETENTION_ACTION: str = os.getenv("HISTORY_RETENTION_ACTION", "archive")
 
     REQUEST_TIMEOUT: int = 10
+    HTTP_POOL_CONNECTIONS: int = 4
+    HTTP_POOL_MAXSIZE: int = 8
+    UPDATE_MAX_WORKERS: int = int(os.getenv("UPDATE_MAX_WORKERS", "4"))
+    UPDATE_DEADLINE: float = float(os.getenv("UPDATE_DEADLINE", "15"))
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY: float = 0.5
+    RETRY_MAX_DELAY: float = 8.0
+    BREAKER_FAILURE_THRESHOLD: int = 3
+    BREAKER_RESET_TIMEOUT: float = float(os.getenv("BREAKER_RESET_TIMEOUT", "60"))
+    RATE_LIMITS: dict[str, tuple[int, float]] = field(
+        default_factory=lambda: {
+            "coingecko": (5, 60.0),
+            "exchangerate": (10, 60.0),
+        }
+    )
+    RATE_LIMIT_STATE_PATH: str | None = None
+    RESPONSE_CACHE_DIR: str | None = os.getenv("RESPONSE_CACHE_DIR")
 
     def __post_init__(self):
+        if self.COINGECKO_VS_CURRENCIES is None:
+            env_vs = os.getenv("COINGECKO_VS_CURRENCIES", "")
+            self.COINGECKO_VS_CURRENCIES = tuple(
+                code.strip().upper() for code in env_vs.split(",") if code.strip()
+            ) or (self.BASE_CURRENCY, *self.FIAT_CURRENCIES)
+
         if self.RATES_FILE_PATH is None:
             project_root = Path(__file__).parent.parent.parent
             self.RATES_FILE_PATH = str(project_root / "data" / "rates.json")
 
+        if self.RATE_LIMIT_STATE_PATH is None:
+            self.RATE_LIMIT_STATE_PATH = str(
+                Path(self.RATES_FILE_PATH).parent / "rate_limits.json"
+            )
+
+        if self.RESPONSE_CACHE_DIR is None:
+            self.RESPONSE_CACHE_DIR = str(
+                Path(self.RATES_FILE_PATH).parent / "http_cache"
+            )
+
         if self.HISTORY_FILE_PATH is None:
             project_root = Path(__file__).parent.parent.parent
-            self.HISTORY_FILE_PATH = str(project_root / "data" / "exchange_rates.json")
+            if self.HISTORY_FORMAT == "partitioned":
+                self.HISTORY_FILE_PATH = str(project_root / "data" / "history")
+            elif self.HISTORY_FORMAT == "columnar":
+                self.HISTORY_FILE_PATH = str(project_root / "data" / "history_columnar")
+            else:
+                suffix = ".ndjson" if self.HISTORY_FORMAT == "ndjson" else ".json"
+                self.HISTORY_FILE_PATH = str(
+                    project_root / "data" / f"exchange_rates{suffix}"
+                )
@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import json
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from valutatrade_hub.parser_service.config import ParserConfig
+
+DEFAULT_CRYPTO_PRICES = {
+    "bitcoin": {"usd": 59337.21},
+    "ethereum": {"usd": 3720.00},
+    "solana": {"usd": 145.12},
+}
+DEFAULT_FIAT_RATES = {
+    "USD": 1.0,
+    "AED": 3.6725,
+    "CHF": 0.881,
+    "EUR": 0.927,
+    "GBP": 0.79,
+    "JPY": 151.37,
+    "RUB": 98.45,
+}
+DEFAULT_CURRENCY_NAMES = {
+    "USD": "United States Dollar",
+    "AED": "UAE Dirham",
+    "CHF": "Swiss Franc",
+    "EUR": "Euro",
+    "GBP": "Pound Sterling",
+    "JPY": "Japanese Yen",
+    "RUB": "Russian Ruble",
+}
+
+
+class FakeRatesServer:
+    """Локальный HTTP-сервер, имитирующий CoinGecko и ExchangeRate-API.
+
+    Нужен для проверки клиентов и RatesUpdater без доступа к сети.
+    Отвечает на GET /api/v3/simple/price (CoinGecko), а также
+    GET /v6/<key>/latest/<base> и GET /v6/<key>/codes (ExchangeRate-API).
+    Задержку ответа и код ошибки можно менять на лету через атрибуты.
+    Ответы несут ETag, и на запрос с совпадающим If-None-Match сервер
+    отвечает 304.
+
+    Пример:
+        with FakeRatesServer(delay=0.2) as server:
+            config = server.configure(ParserConfig())
+            CoinGeckoClient(config).fetch_rates()
+
+    Attributes:
+        crypto_prices (dict): Ответ CoinGecko {id: {vs_currency: price}}.
+        fiat_rates (dict): conversion_rates ExchangeRate-API для USD.
+        delay (float): Задержка перед ответом, секунды.
+        status_override (int | None): Код ошибки для всех ответов.
+        headers_override (dict[str, str]): Дополнительные заголовки ответа.
+        request_count (int): Количество обработанных запросов.
+        updated_at (int): Время обновления курсов ExchangeRate-API (Unix).
+    """
+
+    def __init__(
+        self,
+        crypto_prices: dict | None = None,
+        fiat_rates: dict | None = None,
+        delay: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.crypto_prices = crypto_prices or DEFAULT_CRYPTO_PRICES
+        self.fiat_rates = fiat_rates or DEFAULT_FIAT_RATES
+        self.delay = delay
+        self.status_override: int | None = None
+        self.headers_override: dict[str, str] = {}
+        self.request_count = 0
+        self.updated_at = int(time.time())
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeRatesServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="fake-rates-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeRatesServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def configure(self, config: ParserConfig) -> ParserConfig:
+        """Направляет URL API из config на этот сервер.
+
+        Args:
+            config (ParserConfig): Конфигурация Parser Service.
+
+        Returns:
+            ParserConfig: Та же конфигурация.
+        """
+        config.COINGECKO_URL = f"{self.url}/api/v3/simple/price"
+        config.EXCHANGERATE_API_URL = f"{self.url}/v6"
+        if not config.EXCHANGERATE_API_KEY:
+            config.EXCHANGERATE_API_KEY = "fake-key"
+        return config
+
+    def _prices(self, crypto_id: str, vs: list[str]) -> dict[str, float]:
+        """Цены монеты в валютах vs; недостающие считаются из цены в USD."""
+        prices = self.crypto_prices[crypto_id]
+        result = {}
+        for cur in vs:
+            if cur in prices:
+                result[cur] = prices[cur]
+            elif "usd" in prices and cur.upper() in self.fiat_rates:
+                result[cur] = prices["usd"] * self.fiat_rates[cur.upper()]
+        return result
+
+    def _respond(self, path: str, query: dict[str, list[str]]) -> tuple[int, dict]:
+        parts = [p for p in path.split("/") if p]
+        if path.endswith("/simple/price"):
+            ids = ",".join(query.get("ids", [""])).split(",")
+            vs = [
+                v.lower() for v in ",".join(query.get("vs_currencies", [""])).split(",")
+            ]
+            return 200, {
+                crypto_id: self._prices(crypto_id, vs)
+                for crypto_id in ids
+                if crypto_id in self.crypto_prices
+            }
+        if len(parts) >= 3 and parts[-1] == "codes":
+            return 200, {
+                "result": "success",
+                "supported_codes": [
+                    [code, DEFAULT_CURRENCY_NAMES.get(code, code)]
+                    for code in self.fiat_rates
+                ],
+            }
+        if len(parts) >= 3 and parts[-2] == "latest":
+            base = parts[-1].upper()
+            if base not in self.fiat_rates:
+                return 200, {"result": "error", "error-type": "unsupported-code"}
+            base_rate = self.fiat_rates[base]
+            return 200, {
+                "result": "success",
+                "base_code": base,
+                "time_last_update_unix": self.updated_at,
+                "time_next_update_unix": self.updated_at + 86400,
+                "conversion_rates": {
+                    code: rate / base_rate for code, rate in self.fiat_rates.items()
+                },
+            }
+        return 404, {"error": "not found"}
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                with server._lock:
+                    server.request_count += 1
+                if server.delay:
+                    time.sleep(server.delay)
+
+                parsed = urlparse(self.path)
+                if server.status_override is not None:
+                    status, payload = server.status_override, {"error": "fake error"}
+                else:
+                    status, payload = server._respond(
+                        parsed.path, parse_qs(parsed.query)
+                    )
+
+                body = json.dumps(payload).encode("utf-8")
+                etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status in (200, 304):
+                    self.send_header("ETag", etag)
+                for name, value in server.headers_override.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
+
+
+def check_update_deadline(delay: float = 3.0, deadline: float = 1.0) -> dict:
+    """Замеряет, соблюдает ли RatesUpdater deadline при медленных API.
+
+    Оба источника отвечают через delay секунд; run_update и
+    run_update_async с deadline секунд должны вернуться примерно через
+    deadline, не дожидаясь зависших запросов. Данные пишутся во временный
+    каталог.
+
+    Args:
+        delay (float): Задержка ответа имитатора, секунды.
+        deadline (float): Общий лимит времени обновления, секунды.
+
+    Returns:
+        dict: Время работы {"sync": ..., "async": ...} в секундах.
+    """
+    from valutatrade_hub.parser_service.api_clients import (
+        CoinGeckoClient,
+        ExchangeRateApiClient,
+    )
+    from valutatrade_hub.parser_service.storage import ExchangeRatesStorage
+    from valutatrade_hub.parser_service.updater import RatesUpdater
+
+    timings = {}
+    with FakeRatesServer(delay=delay) as server, tempfile.TemporaryDirectory() as tmp:
+        config = server.configure(ParserConfig())
+        config.RATES_FILE_PATH = str(Path(tmp) / "rates.json")
+        config.HISTORY_FILE_PATH = str(Path(tmp) / "exchange_rates.json")
+        config.RATE_LIMIT_STATE_PATH = str(Path(tmp) / "rate_limits.json")
+        config.RESPONSE_CACHE_DIR = str(Path(tmp) / "http_cache")
+        config.RETRY_MAX_ATTEMPTS = 1
+        for mode in ("sync", "async"):
+            updater = RatesUpdater(
+                [CoinGeckoClient(config), ExchangeRateApiClient(config)],
+                ExchangeRatesStorage.from_config(config),
+                deadline=deadline,
+            )
+            started = time.perf_counter()
+            if mode == "sync":
+                updater.run_update()
+            else:
+                asyncio.run(updater.run_update_async())
+            timings[mode] = time.perf_counter() - started
+    return timings
+
+
+if __name__ == "__main__":
+    if "--check-deadline" in sys.argv:
+        timings = check_update_deadline(delay=3.0, deadline=1.0)
+        for mode, elapsed in timings.items():
+            print(f"{mode}: {elapsed:.2f} s (deadline 1.0 s, API delay 3.0 s)")
+        sys.exit(0 if max(timings.values()) < 1.5 else 1)
+
+    with FakeRatesServer(port=8765) as fake:
+        print(f"CoinGecko:        {fake.url}/api/v3/simple/price")
+        print(f"ExchangeRate-API: {fake.url}/v6")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
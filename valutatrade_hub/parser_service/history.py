@@ -0,0 +1,641 @@
+import bisect
+import gzip
+import heapq
+import os
+import shutil
+from abc import ABC, abstractmethod
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from itertools import chain, islice, pairwise
+from pathlib import Path
+from typing import Any, Generator, Iterable, Iterator
+
+from valutatrade_hub.core.utils import (
+    decode_json,
+    encode_json,
+    load_json,
+    save_json,
+    write_json_bytes,
+)
+
+HistoryTail = Generator[tuple[Any, dict], None, Any]
+
+_NO_TIMESTAMP = float("-inf")
+
+
+def parse_timestamp(value: str | datetime) -> datetime:
+    """Преобразует ISO-строку (в том числе с суффиксом Z) в aware datetime.
+
+    Args:
+        value (str | datetime): Время в ISO-формате или datetime.
+
+    Returns:
+        datetime: Время с часовым поясом (naive считается UTC).
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _no_records(cursor: Any) -> HistoryTail:
+    """Пустой поток записей, возвращающий cursor."""
+    yield from ()
+    return cursor
+
+
+def _in_range(record: dict, since: datetime | None, until: datetime | None) -> bool:
+    try:
+        ts = parse_timestamp(record.get("timestamp", ""))
+    except ValueError:
+        return False
+    return (since is None or ts >= since) and (until is None or ts <= until)
+
+
+class HistoryFile(ABC):
+    """Базовый класс файла истории курсов.
+
+    Attributes:
+        path (Path): Путь к файлу истории.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    @property
+    def index_path(self) -> Path:
+        """Путь к сохраненному индексу пар (см. HistoryIndex)."""
+        return self.path.with_name(f"{self.path.stem}.pairs.idx.json")
+
+    def stamp(self) -> list[int] | None:
+        """Возвращает [st_mtime_ns, st_size] файла или None, если его нет."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @abstractmethod
+    def append(self, records: list[dict]) -> None:
+        """Дописывает записи в конец истории."""
+
+    @abstractmethod
+    def iter_records(self) -> Iterator[dict]:
+        """Перебирает записи истории в порядке добавления."""
+
+    def iter_entries(self) -> Iterator[tuple[Any, dict]]:
+        """Перебирает пары (указатель, запись) для построения индекса.
+
+        По умолчанию указатель — номер записи; форматы, которые умеют
+        читать запись по смещению, возвращают смещение. Указатели
+        сериализуются в JSON вместе с индексом.
+        """
+        yield from enumerate(self.iter_records())
+
+    def read_entries(self, locators: Iterable[Any]) -> Iterator[dict]:
+        """Лениво читает записи по указателям из iter_entries."""
+        records = None
+        for position in locators:
+            if records is None:
+                records = list(self.iter_records())
+            yield records[position]
+
+    def read_since(self, cursor: Any) -> HistoryTail | None:
+        """Возвращает поток записей, добавленных после cursor.
+
+        По умолчанию курсор — число уже прочитанных записей. Append-only
+        форматы возвращают курсор, по которому дочитывают только хвост.
+
+        Args:
+            cursor (Any): Курсор из прошлого вызова или None — с начала.
+
+        Returns:
+            HistoryTail | None: Генератор пар (указатель, запись) как у
+                iter_entries, который по исчерпании возвращает новый курсор
+                (StopIteration.value), или None, если история была
+                переписана и читать нужно с начала.
+        """
+        records = list(self.iter_records())
+        start = cursor or 0
+        if len(records) < start:
+            return None
+        return self._tail(records, start)
+
+    @staticmethod
+    def _tail(records: list[dict], start: int) -> HistoryTail:
+        yield from enumerate(islice(records, start, None), start)
+        return len(records)
+
+    def iter_range(
+        self,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+    ) -> Iterator[dict]:
+        """Перебирает записи, время которых попадает в [since, until].
+
+        Args:
+            since (str | datetime | None): Начало интервала (включительно).
+            until (str | datetime | None): Конец интервала (включительно).
+        """
+        since_dt = parse_timestamp(since) if since is not None else None
+        until_dt = parse_timestamp(until) if until is not None else None
+        for record in self.iter_records():
+            if _in_range(record, since_dt, until_dt):
+                yield record
+
+    def create_index(self) -> "HistoryIndex":
+        """Создает индекс для запросов к истории по парам и интервалам."""
+        return HistoryIndex(self)
+
+
+class JsonHistoryFile(HistoryFile):
+    """История в виде одного JSON-массива (исходный формат).
+
+    Любая операция читает файл целиком, а добавление перезаписывает его.
+    """
+
+    def append(self, records: list[dict]) -> None:
+        history = load_json(self.path, default=list)
+        history.extend(records)
+        save_json(self.path, history)
+
+    def iter_records(self) -> Iterator[dict]:
+        yield from load_json(self.path, default=list)
+
+
+class NdjsonHistoryFile(HistoryFile):
+    """История в формате NDJSON: одна запись на строку.
+
+    Новые записи дописываются в конец файла одним вызовом write, а чтение
+    идет построчно без загрузки всего файла в память. Оборванная последняя
+    строка (например, после сбоя во время записи) пропускается.
+    """
+
+    def append(self, records: list[dict]) -> None:
+        if not records:
+            return
+        payload = b"".join(encode_json(r, codec="fast") + b"\n" for r in records)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab+") as f:
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    payload = b"\n" + payload
+            f.write(payload)
+
+    def iter_records(self) -> Iterator[dict]:
+        for _, record in self.iter_entries():
+            yield record
+
+    def iter_entries(self) -> Iterator[tuple[int, dict]]:
+        try:
+            with self.path.open("rb") as f:
+                offset = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        yield offset, decode_json(line)
+                    except ValueError:
+                        pass
+                    offset += len(line)
+        except FileNotFoundError:
+            return
+
+    def read_entries(self, locators: Iterable[int]) -> Iterator[dict]:
+        locators = iter(locators)
+        first = next(locators, None)
+        if first is None:
+            return
+        with self.path.open("rb") as f:
+            for offset in chain((first,), locators):
+                f.seek(offset)
+                yield decode_json(f.readline())
+
+    def read_since(self, cursor: list[int] | None) -> HistoryTail | None:
+        """Дочитывает строки после смещения из cursor [inode, смещение].
+
+        Строки читаются потоком по мере перебора. Если файл заменен другим
+        (сменился inode) или стал короче смещения, возвращает None.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None if cursor is not None else _no_records(None)
+        offset = 0
+        if cursor is not None:
+            if cursor[0] != stat.st_ino or stat.st_size < cursor[1]:
+                return None
+            offset = cursor[1]
+        return self._read_from(offset)
+
+    def _read_from(self, offset: int) -> HistoryTail:
+        with self.path.open("rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = decode_json(line)
+                except ValueError:
+                    record = None
+                if record is not None:
+                    yield offset, record
+                offset += len(line)
+        return [inode, offset]
+
+
+class PartitionedHistoryFile(HistoryFile):
+    """История, разбитая на NDJSON-файлы по дням или месяцам.
+
+    Записи попадают в файл своего периода по UTC (например,
+    history/2026-10.ndjson), поэтому запрос за интервал открывает только
+    пересекающиеся с ним файлы, а старые периоды можно удалять или
+    архивировать целиком.
+
+    Attributes:
+        path (Path): Каталог с файлами-партициями.
+        partition (str): Период партиции: "day" или "month".
+    """
+
+    def __init__(self, path: str | Path, partition: str = "month"):
+        super().__init__(path)
+        if partition not in ("day", "month"):
+            raise ValueError(f"Unknown history partition: {partition}")
+        self.partition = partition
+        self._key_length = 10 if partition == "day" else 7
+
+    @property
+    def archive_dir(self) -> Path:
+        return self.path / "archive"
+
+    def _partition_key(self, value: str | datetime) -> str:
+        moment = parse_timestamp(value).astimezone(timezone.utc)
+        return moment.strftime("%Y-%m-%d")[: self._key_length]
+
+    def _partition_end(self, key: str) -> datetime:
+        if self.partition == "day":
+            start = datetime.strptime(key, "%Y-%m-%d")
+            end = start + timedelta(days=1)
+        else:
+            start = datetime.strptime(key, "%Y-%m")
+            end = (start + timedelta(days=32)).replace(day=1)
+        return end.replace(tzinfo=timezone.utc)
+
+    def partitions(self) -> list[Path]:
+        """Возвращает файлы-партиции в хронологическом порядке."""
+        if not self.path.is_dir():
+            return []
+        return sorted(self.path.glob("*.ndjson"))
+
+    def stamp(self) -> list | None:
+        stamps = []
+        for partition in self.partitions():
+            stat = partition.stat()
+            stamps.append([partition.name, stat.st_mtime_ns, stat.st_size])
+        return stamps or None
+
+    def append(self, records: list[dict]) -> None:
+        grouped: dict[str, list[dict]] = {}
+        for record in records:
+            key = self._partition_key(record["timestamp"])
+            grouped.setdefault(key, []).append(record)
+        for key, group in grouped.items():
+            NdjsonHistoryFile(self.path / f"{key}.ndjson").append(group)
+
+    def iter_records(self) -> Iterator[dict]:
+        for partition in self.partitions():
+            yield from NdjsonHistoryFile(partition).iter_records()
+
+    def iter_entries(self) -> Iterator[tuple[tuple[str, int], dict]]:
+        for partition in self.partitions():
+            for offset, record in NdjsonHistoryFile(partition).iter_entries():
+                yield (partition.name, offset), record
+
+    def read_since(self, cursor: dict[str, list[int]] | None) -> HistoryTail | None:
+        """Дочитывает новые строки партиций; курсор — курсоры по партициям.
+
+        Если партиция из курсора исчезла (например, после очистки по сроку
+        хранения), возвращает None.
+        """
+        cursor = cursor or {}
+        names = [partition.name for partition in self.partitions()]
+        if not set(cursor) <= set(names):
+            return None
+        tails = []
+        for name in names:
+            tail = NdjsonHistoryFile(self.path / name).read_since(cursor.get(name))
+            if tail is None:
+                return None
+            tails.append((name, tail))
+        return self._read_tails(tails)
+
+    @staticmethod
+    def _read_tails(tails: list[tuple[str, HistoryTail]]) -> HistoryTail:
+        new_cursor = {}
+        for name, tail in tails:
+            while True:
+                try:
+                    offset, record = next(tail)
+                except StopIteration as stop:
+                    if stop.value is not None:
+                        new_cursor[name] = stop.value
+                    break
+                yield (name, offset), record
+        return new_cursor
+
+    def read_entries(self, locators: Iterable[tuple[str, int]]) -> Iterator[dict]:
+        with ExitStack() as stack:
+            files = {}
+            for name, offset in locators:
+                if name not in files:
+                    files[name] = stack.enter_context((self.path / name).open("rb"))
+                f = files[name]
+                f.seek(offset)
+                yield decode_json(f.readline())
+
+    def iter_range(
+        self,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+    ) -> Iterator[dict]:
+        since_dt = parse_timestamp(since) if since is not None else None
+        until_dt = parse_timestamp(until) if until is not None else None
+        since_key = self._partition_key(since_dt) if since_dt else None
+        until_key = self._partition_key(until_dt) if until_dt else None
+
+        for partition in self.partitions():
+            key = partition.stem
+            if (since_key and key < since_key) or (until_key and key > until_key):
+                continue
+            for record in NdjsonHistoryFile(partition).iter_records():
+                if _in_range(record, since_dt, until_dt):
+                    yield record
+
+    def apply_retention(self, max_age_days: int, action: str = "archive") -> list[str]:
+        """Удаляет или архивирует партиции старше max_age_days.
+
+        Партиция считается устаревшей, если весь ее период закончился
+        раньше, чем max_age_days назад. При архивации файл сжимается в
+        archive/<период>.ndjson.gz.
+
+        Args:
+            max_age_days (int): Максимальный возраст данных в днях.
+            action (str): "archive" или "delete".
+
+        Returns:
+            list[str]: Периоды обработанных партиций.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        expired = []
+        for partition in self.partitions():
+            try:
+                end = self._partition_end(partition.stem)
+            except ValueError:
+                continue
+            if end > cutoff:
+                continue
+
+            if action == "archive":
+                self.archive_dir.mkdir(parents=True, exist_ok=True)
+                target = self.archive_dir / f"{partition.name}.gz"
+                with partition.open("rb") as src, gzip.open(target, "ab") as dst:
+                    shutil.copyfileobj(src, dst)
+            partition.unlink()
+            expired.append(partition.stem)
+        return expired
+
+
+class HistoryIndex:
+    """Индекс истории: записи каждой пары, упорядоченные по времени.
+
+    Для каждой пары хранятся отсортированные метки времени (epoch-секунды)
+    и указатели на записи, поэтому последние N записей пары или записи за
+    интервал находятся за O(log n + N) без полного чтения истории. Сами
+    записи в индексе не хранятся: при построении история читается потоком.
+
+    Индекс сохраняется рядом с историей (HistoryFile.index_path) вместе с
+    курсором чтения, поэтому новый процесс загружает его и дочитывает
+    только записи, добавленные после курсора (см. HistoryFile.read_since).
+    Полностью индекс перестраивается, только если историю переписали.
+
+    Attributes:
+        history (HistoryFile): Индексируемый файл истории.
+        index_path (Path): Путь к сохраненному индексу.
+    """
+
+    def __init__(self, history: HistoryFile):
+        self.history = history
+        self.index_path = history.index_path
+        self._stamp: Any = None
+        self._cursor: Any = None
+        self._built = False
+        self._timestamps: dict[str, list[float]] = {}
+        self._locators: dict[str, list[Any]] = {}
+
+    @staticmethod
+    def _entry_key(record: dict) -> tuple[str, float]:
+        pair_key = f"{record.get('from_currency')}_{record.get('to_currency')}"
+        try:
+            ts = parse_timestamp(record.get("timestamp", "")).timestamp()
+        except ValueError:
+            ts = _NO_TIMESTAMP
+        return pair_key, ts
+
+    def _load(self) -> bool:
+        stored = load_json(self.index_path, default=dict)
+        if not isinstance(stored, dict) or not isinstance(stored.get("pairs"), dict):
+            return False
+        self._timestamps = {}
+        self._locators = {}
+        for pair_key, (timestamps, locators) in stored["pairs"].items():
+            if None in timestamps:
+                # -inf (запись без времени) сохраняется в JSON как null.
+                timestamps = [_NO_TIMESTAMP if ts is None else ts for ts in timestamps]
+            self._timestamps[pair_key] = timestamps
+            self._locators[pair_key] = locators
+        self._stamp = stored.get("stamp")
+        self._cursor = stored.get("cursor")
+        return True
+
+    def _save(self) -> None:
+        index = {
+            "stamp": self._stamp,
+            "cursor": self._cursor,
+            "pairs": {
+                pair_key: [timestamps, self._locators[pair_key]]
+                for pair_key, timestamps in self._timestamps.items()
+            },
+        }
+        try:
+            write_json_bytes(self.index_path, encode_json(index, "fast"))
+        except OSError:
+            # Индекс — только ускорение: без файла он строится заново.
+            pass
+
+    def _extend(self, tail: HistoryTail) -> Any:
+        """Добавляет записи из потока в индекс и возвращает новый курсор."""
+        touched = set()
+        while True:
+            try:
+                locator, record = next(tail)
+            except StopIteration as stop:
+                cursor = stop.value
+                break
+            pair_key, ts = self._entry_key(record)
+            self._timestamps.setdefault(pair_key, []).append(ts)
+            self._locators.setdefault(pair_key, []).append(locator)
+            touched.add(pair_key)
+
+        # Записи почти всегда приходят по времени; сортируем только пары,
+        # в которых порядок нарушен (сортировка устойчивая).
+        for pair_key in touched:
+            timestamps = self._timestamps[pair_key]
+            if any(a > b for a, b in pairwise(timestamps)):
+                order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+                locators = self._locators[pair_key]
+                self._timestamps[pair_key] = [timestamps[i] for i in order]
+                self._locators[pair_key] = [locators[i] for i in order]
+        return cursor
+
+    def _refresh(self) -> None:
+        stamp = self.history.stamp()
+        if self._built and stamp == self._stamp:
+            return
+        if not self._built:
+            self._built = True
+            if self._load() and stamp == self._stamp:
+                return
+            tail = self.history.read_since(self._cursor) if self._stamp else None
+        else:
+            tail = self.history.read_since(self._cursor)
+
+        if tail is None:
+            self._timestamps = {}
+            self._locators = {}
+            tail = self.history.read_since(None) or _no_records(None)
+        self._cursor = self._extend(tail)
+        self._stamp = stamp
+        self._save()
+
+    def pairs(self) -> list[str]:
+        """Возвращает ключи всех пар, встречающихся в истории."""
+        self._refresh()
+        return list(self._timestamps)
+
+    def iter_pair(
+        self,
+        pair_key: str,
+        since: float | None = None,
+        until: float | None = None,
+        oldest_first: bool = False,
+    ) -> Iterator[tuple[float, Any]]:
+        """Перебирает (время, указатель) записей пары от новых к старым.
+
+        Args:
+            pair_key (str): Ключ пары, например "BTC_USD".
+            since (float | None): Нижняя граница времени (epoch, включительно).
+            until (float | None): Верхняя граница времени (epoch, включительно).
+            oldest_first (bool): Перебирать от старых записей к новым.
+        """
+        self._refresh()
+        timestamps = self._timestamps.get(pair_key, [])
+        locators = self._locators.get(pair_key, [])
+        lo = 0 if since is None else bisect.bisect_left(timestamps, since)
+        hi = (
+            len(timestamps) if until is None else bisect.bisect_right(timestamps, until)
+        )
+        positions = range(lo, hi) if oldest_first else range(hi - 1, lo - 1, -1)
+        for i in positions:
+            yield timestamps[i], locators[i]
+
+    def iter_records(
+        self,
+        from_currency: str | None = None,
+        to_currency: str | None = None,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+        oldest_first: bool = False,
+    ) -> Iterator[dict]:
+        """Лениво перебирает записи подходящих пар от новых к старым.
+
+        Args:
+            from_currency (str | None): Фильтр по исходной валюте.
+            to_currency (str | None): Фильтр по целевой валюте.
+            since (str | datetime | None): Начало интервала (включительно).
+            until (str | datetime | None): Конец интервала (включительно).
+            oldest_first (bool): Перебирать от старых записей к новым.
+        """
+        since_ts = parse_timestamp(since).timestamp() if since is not None else None
+        until_ts = parse_timestamp(until).timestamp() if until is not None else None
+
+        streams = []
+        for pair_key in self.pairs():
+            from_cur, _, to_cur = pair_key.partition("_")
+            if from_currency and from_cur != from_currency:
+                continue
+            if to_currency and to_cur != to_currency:
+                continue
+            streams.append(self.iter_pair(pair_key, since_ts, until_ts, oldest_first))
+
+        merged = heapq.merge(
+            *streams, key=lambda item: item[0], reverse=not oldest_first
+        )
+        yield from self.history.read_entries(locator for _, locator in merged)
+
+
+def create_history_file(
+    path: str | Path, history_format: str, partition: str = "month"
+) -> HistoryFile:
+    """Создает объект файла истории для указанного формата.
+
+    Args:
+        path (str | Path): Путь к файлу истории (для "partitioned" и
+            "columnar" — каталог).
+        history_format (str): "json", "ndjson", "partitioned" или "columnar".
+        partition (str): Период партиции для "partitioned": "day" или "month".
+
+    Raises:
+        ValueError: Если формат не поддерживается.
+
+    Returns:
+        HistoryFile: Файл истории.
+    """
+    history_format = history_format.lower()
+    if history_format == "json":
+        return JsonHistoryFile(path)
+    if history_format == "ndjson":
+        return NdjsonHistoryFile(path)
+    if history_format == "partitioned":
+        return PartitionedHistoryFile(path, partition)
+    if history_format == "columnar":
+        from valutatrade_hub.parser_service.columnar import ColumnarHistoryFile
+
+        return ColumnarHistoryFile(path)
+    raise ValueError(f"Unknown history format: {history_format}")
+
+
+def convert_json_history(source: str | Path, target: HistoryFile) -> int:
+    """Переносит историю из JSON-массива в другой формат хранения.
+
+    Записи дописываются в target, поэтому уже накопленная в нем история
+    сохраняется, а записи с совпадающим id пропускаются. Исходный файл
+    не изменяется.
+
+    Args:
+        source (str | Path): Путь к истории в формате JSON-массива.
+        target (HistoryFile): Файл истории в новом формате.
+
+    Returns:
+        int: Количество перенесенных записей.
+    """
+    existing_ids = {r.get("id") for r in target.iter_records()}
+    new_records = [
+        r
+        for r in JsonHistoryFile(source).iter_records()
+        if r.get("id") not in existing_ids
+    ]
+    target.append(new_records)
+    return len(new_records)
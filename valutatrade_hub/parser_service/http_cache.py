@@ -0,0 +1,120 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+import requests
+
+from valutatrade_hub.core.utils import decode_json, encode_json
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)")
+
+
+class ResponseCache:
+    """Дисковый кэш ответов API для условных запросов.
+
+    Для каждого запроса (URL и параметры) хранится JSON-файл с телом
+    последнего успешного ответа и метаданными: ETag, Last-Modified и
+    временем следующего обновления данных у источника (next_update, Unix
+    time), взятым из ответа или из Cache-Control: max-age. До next_update
+    запрос не выполняется вовсе, а после него отправляется с
+    If-None-Match/If-Modified-Since, и ответ 304 берется из кэша.
+
+    Имя файла — хэш запроса, в котором значения secrets (например, ключ
+    API в URL) заменены заглушкой, поэтому ключ не участвует в имени и
+    смена ключа не сбрасывает кэш.
+
+    Attributes:
+        directory (Path): Каталог с файлами кэша.
+        secrets (tuple[str, ...]): Значения, исключаемые из ключа кэша.
+    """
+
+    def __init__(self, directory: str | Path, secrets: tuple[str, ...] = ()):
+        self.directory = Path(directory)
+        self.secrets = tuple(secret for secret in secrets if secret)
+
+    def _path(self, url: str, params: dict | None) -> Path:
+        key = url if not params else f"{url}?{urlencode(sorted(params.items()))}"
+        for secret in self.secrets:
+            key = key.replace(secret, "<redacted>")
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def load(self, url: str, params: dict | None = None) -> dict | None:
+        """Возвращает запись кэша для запроса или None.
+
+        Returns:
+            dict | None: Запись с ключами "body", "etag", "last_modified",
+                "next_update" и "fetched_at".
+        """
+        try:
+            with open(self._path(url, params), "rb") as f:
+                entry = decode_json(f.read())
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        return entry if isinstance(entry, dict) and "body" in entry else None
+
+    def fresh(self, url: str, params: dict | None = None) -> object | None:
+        """Возвращает тело ответа, если данные источника еще не обновились.
+
+        Returns:
+            object | None: Тело ответа или None, если запрос нужен.
+        """
+        entry = self.load(url, params)
+        if entry is None or not entry.get("next_update"):
+            return None
+        return entry["body"] if time.time() < entry["next_update"] else None
+
+    def conditional_headers(self, url: str, params: dict | None = None) -> dict:
+        """Возвращает заголовки условного запроса по сохраненному ответу."""
+        entry = self.load(url, params)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(
+        self,
+        url: str,
+        params: dict | None,
+        response: requests.Response,
+        body: object,
+        next_update: float | None = None,
+    ) -> None:
+        """Сохраняет успешный ответ.
+
+        Args:
+            url (str): URL запроса.
+            params (dict | None): Параметры запроса.
+            response (requests.Response): Ответ (для заголовков).
+            body (object): Разобранное тело ответа.
+            next_update (float | None): Время следующего обновления данных
+                у источника; по умолчанию берется из Cache-Control: max-age.
+        """
+        if next_update is None:
+            match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+            if match:
+                next_update = time.time() + int(match.group(1))
+
+        entry = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "next_update": next_update,
+            "fetched_at": time.time(),
+            "body": body,
+        }
+        path = self._path(url, params)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(
+            f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(tmp_path, "wb") as f:
+            f.write(encode_json(entry, "fast"))
+        os.replace(tmp_path, path)
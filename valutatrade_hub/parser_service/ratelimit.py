@@ -0,0 +1,78 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from valutatrade_hub.core.exceptions import ProviderUnavailableError
+from valutatrade_hub.infra.singleflight import file_lock
+from valutatrade_hub.logging_config import get_logger
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов к источнику по алгоритму token bucket.
+
+    Ведро вмещает capacity жетонов и пополняется со скоростью capacity
+    жетонов за period секунд; каждый запрос расходует один жетон. Состояние
+    всех ведер хранится в общем JSON-файле и меняется под файловой
+    блокировкой, поэтому квоту делят между собой все процессы: сессии CLI,
+    планировщик и обновления при торговых операциях.
+
+    Attributes:
+        name (str): Имя источника (ключ в файле состояния).
+        capacity (int): Емкость ведра, запросов.
+        period (float): Время полного пополнения ведра, секунды.
+        state_path (Path): Путь к файлу состояния.
+    """
+
+    def __init__(self, name: str, capacity: int, period: float, state_path: Path):
+        self.name = name
+        self.capacity = max(1, int(capacity))
+        self.period = float(period)
+        self.state_path = Path(state_path)
+        self.lock_path = self.state_path.with_name(self.state_path.name + ".lock")
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period if self.period > 0 else float("inf")
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _save_state(self, state: dict) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def acquire(self) -> None:
+        """Расходует один жетон или сразу сообщает, когда он появится.
+
+        Raises:
+            ProviderUnavailableError: Если жетонов нет; retry_in — время до
+                появления следующего жетона.
+        """
+        with file_lock(self.lock_path):
+            now = time.time()
+            state = self._load_state()
+            bucket = state.get(self.name) or {}
+            tokens = float(bucket.get("tokens", self.capacity))
+            updated_at = float(bucket.get("updated_at", now))
+            elapsed = max(0.0, now - updated_at)
+            tokens = min(self.capacity, tokens + elapsed * self.refill_rate)
+
+            if tokens < 1:
+                retry_in = (1 - tokens) / self.refill_rate
+                get_logger().warning(
+                    f"Rate limit for {self.name} exhausted, "
+                    f"next token in {retry_in:.1f}s"
+                )
+                raise ProviderUnavailableError(self.name, retry_in)
+
+            state[self.name] = {"tokens": tokens - 1, "updated_at": now}
+            self._save_state(state)
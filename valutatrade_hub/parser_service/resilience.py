@@ -0,0 +1,277 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Executor
+
+import requests
+
+from valutatrade_hub.core.exceptions import ApiRequestError, ProviderUnavailableError
+from valutatrade_hub.logging_config import get_logger
+from valutatrade_hub.parser_service.api_clients import BaseApiClient, FetchResult
+from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.ratelimit import TokenBucket
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def is_retryable(error: ApiRequestError) -> bool:
+    """Проверяет, имеет ли смысл повторить запрос после ошибки.
+
+    Повторяются ответы 429 и 5xx и ошибки соединения. Истекший таймаут
+    чтения не повторяется: повтор стоил бы еще одного полного таймаута.
+    """
+    if error.status_code is not None:
+        return error.status_code in RETRY_STATUS_CODES
+    cause = error.__cause__
+    if isinstance(cause, requests.exceptions.ReadTimeout):
+        return False
+    return isinstance(
+        cause, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    )
+
+
+def is_provider_fault(error: ApiRequestError) -> bool:
+    """Проверяет, говорит ли ошибка о недоступности источника.
+
+    Такие ошибки учитываются предохранителем. Ответы 4xx кроме 429 (например,
+    неверный ключ API) означают, что источник доступен.
+    """
+    if error.status_code is not None:
+        return error.status_code in RETRY_STATUS_CODES
+    return isinstance(error.__cause__, requests.exceptions.RequestException)
+
+
+class RetryPolicy:
+    """Ограниченные повторы с экспоненциальной задержкой и случайным разбросом.
+
+    Задержка перед повтором n (с нуля) выбирается случайно из
+    [0, min(max_delay, base_delay * 2**n)] ("full jitter"), чтобы
+    несколько процессов не повторяли запросы одновременно. Если сервер
+    прислал Retry-After, ждем не меньше указанного; если он больше
+    max_delay, повтор не выполняется.
+
+    Attributes:
+        max_attempts (int): Максимальное число попыток, включая первую.
+        base_delay (float): Базовая задержка, секунды.
+        max_delay (float): Максимальная задержка, секунды.
+    """
+
+    def __init__(
+        self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0
+    ):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float | None:
+        """Возвращает задержку перед следующей попыткой или None, если повтора нет.
+
+        Args:
+            attempt (int): Номер неудачной попытки (с нуля).
+            retry_after (float | None): Значение Retry-After, секунды.
+        """
+        if attempt + 1 >= self.max_attempts:
+            return None
+        if retry_after is not None and retry_after > self.max_delay:
+            return None
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """Предохранитель источника курсов.
+
+    После failure_threshold неудачных обращений подряд предохранитель
+    размыкается на reset_timeout секунд (или до момента из Retry-After, если
+    он позже), и обращения к источнику сразу завершаются ошибкой. Затем
+    пропускается одна пробная попытка: успех замыкает предохранитель,
+    неудача снова размыкает его.
+
+    Attributes:
+        name (str): Имя источника.
+        failure_threshold (int): Число неудач подряд до размыкания.
+        reset_timeout (float): Время в разомкнутом состоянии, секунды.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 3, reset_timeout: float = 60
+    ):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self._open_until
+
+    def before_call(self) -> None:
+        """Проверяет, можно ли обращаться к источнику.
+
+        Raises:
+            ProviderUnavailableError: Если предохранитель разомкнут или уже
+                идет пробная попытка.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._open_until:
+                raise ProviderUnavailableError(self.name, self._open_until - now)
+            if self._failures >= self.failure_threshold:
+                if self._probing:
+                    raise ProviderUnavailableError(self.name, 0)
+                self._probing = True
+
+    def release(self) -> None:
+        """Отменяет пробную попытку, которая так и не была выполнена."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._open_until = 0.0
+            self._probing = False
+
+    def record_failure(self, retry_after: float | None = None) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.failure_threshold or retry_after:
+                self._failures = max(self._failures, self.failure_threshold)
+                wait_for = max(self.reset_timeout, retry_after or 0.0)
+                self._open_until = time.monotonic() + wait_for
+                get_logger().warning(
+                    f"Circuit breaker for {self.name} opened for {wait_for:.0f}s"
+                )
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, config: ParserConfig) -> CircuitBreaker:
+    """Возвращает общий для процесса предохранитель источника name."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=config.BREAKER_RESET_TIMEOUT,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+class ResilientClient:
+    """Обертка API-клиента с повторами и предохранителем.
+
+    Повторяет запросы по RetryPolicy и ведет учет неудач в общем для
+    процесса предохранителе источника. Если источник еще не обновил
+    данные (см. BaseApiClient.cached_rates), курсы берутся из кэша ответов
+    без проверки предохранителя и расхода квоты. Пока предохранитель
+    разомкнут, fetch_rates сразу выбрасывает ProviderUnavailableError без
+    HTTP-запроса, и вызывающий код может использовать кэш курсов. То же
+    происходит, если у источника закончилась квота запросов (см.
+    ParserConfig.RATE_LIMITS): каждый HTTP-запрос клиента, включая
+    повторы и пакеты, расходует жетон общего для всех процессов
+    TokenBucket.
+
+    Обертка повторяет интерфейс BaseApiClient, используемый обновлением
+    курсов: name, source_name, currency_class, cached_rates, fetch_rates и
+    fetch_rates_async.
+
+    Attributes:
+        client (BaseApiClient): Оборачиваемый клиент.
+        retry (RetryPolicy): Политика повторов.
+        breaker (CircuitBreaker): Предохранитель источника.
+        limiter (TokenBucket | None): Ограничитель частоты запросов или
+            None, если лимит для источника не задан.
+    """
+
+    def __init__(self, client: BaseApiClient, config: ParserConfig | None = None):
+        self.client = client
+        self.config = config or getattr(client, "config", None) or ParserConfig()
+        self.source_name = client.source_name
+        self.currency_class = client.currency_class
+        self.retry = RetryPolicy(
+            self.config.RETRY_MAX_ATTEMPTS,
+            self.config.RETRY_BASE_DELAY,
+            self.config.RETRY_MAX_DELAY,
+        )
+        self.breaker = get_breaker(client.source_name, self.config)
+        limit = self.config.RATE_LIMITS.get(client.source_name)
+        self.limiter = (
+            TokenBucket(
+                client.source_name, *limit, state_path=self.config.RATE_LIMIT_STATE_PATH
+            )
+            if limit
+            else None
+        )
+        client.rate_limiter = self.limiter
+        self.logger = get_logger()
+
+    @classmethod
+    def wrap(cls, client: "BaseApiClient | ResilientClient") -> "ResilientClient":
+        """Оборачивает клиент, если он еще не обернут."""
+        return client if isinstance(client, cls) else cls(client)
+
+    @property
+    def name(self) -> str:
+        return self.client.name
+
+    @property
+    def last_timings(self) -> dict[str, float]:
+        return getattr(self.client, "last_timings", {})
+
+    def cached_rates(self) -> FetchResult | None:
+        return self.client.cached_rates()
+
+    def fetch_rates(self) -> FetchResult:
+        """Получает курсы через оборачиваемый клиент с повторами.
+
+        Raises:
+            ProviderUnavailableError: Если предохранитель разомкнут или
+                исчерпана квота запросов.
+            ApiRequestError: Если все попытки завершились ошибкой.
+
+        Returns:
+            FetchResult: Результат опроса оборачиваемого клиента.
+        """
+        cached = self.client.cached_rates()
+        if cached is not None:
+            return cached
+        self.breaker.before_call()
+        attempt = 0
+        while True:
+            try:
+                result = self.client.fetch_rates()
+            except ProviderUnavailableError:
+                self.breaker.release()
+                raise
+            except ApiRequestError as e:
+                delay = self.retry.delay(attempt, e.retry_after)
+                if delay is None or not is_retryable(e):
+                    if is_provider_fault(e):
+                        self.breaker.record_failure(e.retry_after)
+                    else:
+                        self.breaker.record_success()
+                    raise
+                self.logger.warning(
+                    f"{self.name} attempt {attempt + 1} failed: {e.reason}; "
+                    f"retrying in {delay:.2f}s"
+                )
+                time.sleep(delay)
+                attempt += 1
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def fetch_rates_async(self, executor: Executor | None = None) -> FetchResult:
+        """Асинхронная версия fetch_rates (см. BaseApiClient.fetch_rates_async)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.fetch_rates)
@@ -1,20 +1,122 @@
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
 
 from valutatrade_hub.core.utils import load_json, save_json
 from valutatrade_hub.logging_config import get_logger
+from valutatrade_hub.parser_service.history import (
+    PartitionedHistoryFile,
+    create_history_file,
+    parse_timestamp,
+)
+
+if TYPE_CHECKING:
+    from valutatrade_hub.parser_service.config import ParserConfig
 
 
 class ExchangeRatesStorage:
-    """Хранилище для курсов валют: история и кэш."""
+    """Хранилище для курсов валют: история и кэш.
+
+    Для проверки дублей рядом с историей хранится индекс
+    (exchange_rates.json -> exchange_rates.idx.json) с временем последней
+    записи по каждой паре. Запись новее последней для ее пары добавляется
+    сразу, а запись с тем же моментом времени считается дублем, поэтому
+    обычная проверка стоит O(1) на пару. Только для записей старше
+    последней (пришедших не по порядку) история читается один раз, и
+    дублем считается запись с уже существующим id.
+
+    История хранится в формате history_format: "json" (один JSON-массив,
+    перезаписывается при каждом обновлении), "ndjson" (запись на строку,
+    новые записи дописываются в конец файла) или "partitioned" (NDJSON-файлы
+    по дням или месяцам в каталоге history_file_path) или "columnar"
+    (бинарные колонки array по парам в каталоге history_file_path,
+    читаются через mmap). Для "partitioned"
+    можно задать срок хранения retention_days: более старые партиции
+    архивируются или удаляются после каждого сохранения.
+
+    Время последнего опроса источников хранится отдельно от кэша курсов
+    (rates.json -> rates.checked.json), поэтому ответ 304 или пропущенный
+    запрос обновляет только этот небольшой файл, а rates.json и история
+    не перезаписываются.
+    """
 
-    def __init__(self, history_file_path: str, rates_file_path: str):
+    def __init__(
+        self,
+        history_file_path: str,
+        rates_file_path: str,
+        history_format: str = "json",
+        partition: str = "month",
+        retention_days: int = 0,
+        retention_action: str = "archive",
+    ):
         self.history_file_path = Path(history_file_path)
         self.rates_file_path = Path(rates_file_path)
+        self.history = create_history_file(
+            self.history_file_path, history_format, partition
+        )
+        self.history_index = self.history.create_index()
+        self.retention_days = retention_days
+        self.retention_action = retention_action
+        self.index_file_path = self.history_file_path.with_name(
+            f"{self.history_file_path.stem}.idx.json"
+        )
+        self.checked_file_path = self.rates_file_path.with_name(
+            f"{self.rates_file_path.stem}.checked.json"
+        )
         self.logger = get_logger()
 
+    @classmethod
+    def from_config(cls, config: "ParserConfig") -> "ExchangeRatesStorage":
+        """Создает хранилище по настройкам Parser Service.
+
+        Args:
+            config (ParserConfig): Конфигурация Parser Service.
+
+        Returns:
+            ExchangeRatesStorage: Хранилище курсов.
+        """
+        return cls(
+            config.HISTORY_FILE_PATH or "data/exchange_rates.json",
+            config.RATES_FILE_PATH or "data/rates.json",
+            history_format=config.HISTORY_FORMAT,
+            partition=config.HISTORY_PARTITION,
+            retention_days=config.HISTORY_RETENTION_DAYS,
+            retention_action=config.HISTORY_RETENTION_ACTION,
+        )
+
+    def _load_last_timestamps(self) -> dict[str, str]:
+        index = load_json(self.index_file_path, default=dict)
+        if index and index.get("stamp") == self.history.stamp():
+            return index.get("last_timestamp", {})
+
+        last_timestamp: dict[str, str] = {}
+        last_moment: dict[str, datetime] = {}
+        for record in self.history.iter_records():
+            pair_key = f"{record.get('from_currency')}_{record.get('to_currency')}"
+            try:
+                moment = parse_timestamp(record.get("timestamp", ""))
+            except ValueError:
+                continue
+            if pair_key not in last_moment or moment > last_moment[pair_key]:
+                last_moment[pair_key] = moment
+                last_timestamp[pair_key] = record["timestamp"]
+        return last_timestamp
+
+    def _save_last_timestamps(self, last_timestamp: dict[str, str]) -> None:
+        save_json(
+            self.index_file_path,
+            {"stamp": self.history.stamp(), "last_timestamp": last_timestamp},
+        )
+
     def save_rates(
-        self, rates: dict[str, float], source: str, timestamp: str | None = None
+        self,
+        rates: dict[str, float],
+        source: str,
+        timestamp: str | None = None,
+        pair_sources: dict[str, str] | None = None,
+        checked_sources: list[str] | None = None,
+        tables: dict[str, dict] | None = None,
     ) -> None:
         """Сохраняет курсы в историю и обновляет кэш.
 
@@ -22,20 +124,53 @@ class ExchangeRatesStorage:
             rates (dict[str, float]): Курсы в формате {"PAIR": rate}.
             source (str): Источник данных.
             timestamp (str | None): Время обновления (ISO формат).
+            pair_sources (dict[str, str] | None): Источник по паре, если
+                курсы получены из разных источников; для остальных пар
+                используется source.
+            checked_sources (list[str] | None): Источники, опрошенные в
+                этом обновлении; время проверки записывается в
+                rates.checked.json даже для источников, вернувших ошибку.
+            tables (dict[str, dict] | None): Полные таблицы курсов по
+                источнику ({"base", "codes", "rates", "names"}); в кэш
+                записываются в "tables" как вектор курсов относительно
+                base и в историю не попадают.
         """
         if timestamp is None:
             ts = datetime.now(timezone.utc).isoformat()
             timestamp = ts.replace("+00:00", "Z")
 
-        self._append_to_history(rates, source, timestamp)
-        self._update_cache(rates, source, timestamp)
+        pair_sources = pair_sources or {}
+        self._append_to_history(rates, source, timestamp, pair_sources)
+        self._update_cache(
+            rates, source, timestamp, pair_sources, checked_sources, tables
+        )
+        self._apply_retention()
+
+    def _apply_retention(self) -> None:
+        if self.retention_days <= 0:
+            return
+        if not isinstance(self.history, PartitionedHistoryFile):
+            return
+        expired = self.history.apply_retention(
+            self.retention_days, self.retention_action
+        )
+        if expired:
+            self.logger.info(
+                f"History retention ({self.retention_action}): {', '.join(expired)}"
+            )
 
     def _append_to_history(
-        self, rates: dict[str, float], source: str, timestamp: str
+        self,
+        rates: dict[str, float],
+        source: str,
+        timestamp: str,
+        pair_sources: dict[str, str],
     ) -> None:
-        history = load_json(self.history_file_path, default=list)
+        last_timestamp = self._load_last_timestamps()
+        moment = parse_timestamp(timestamp)
+        existing_ids: set[str] | None = None
 
-        added_count = 0
+        new_records = []
         for pair_key, rate in rates.items():
             if "_" not in pair_key:
                 self.logger.warning(f"Invalid pair key format: {pair_key}")
@@ -45,8 +180,15 @@ class ExchangeRatesStorage:
 
             record_id = f"{from_currency}_{to_currency}_{timestamp}"
 
-            if any(record.get("id") == record_id for record in history):
-                continue
+            last = last_timestamp.get(pair_key)
+            is_latest = last is None or moment > parse_timestamp(last)
+            if not is_latest:
+                if moment == parse_timestamp(last):
+                    continue
+                if existing_ids is None:
+                    existing_ids = {r.get("id") for r in self.history.iter_records()}
+                if record_id in existing_ids:
+                    continue
 
             record = {
                 "id": record_id,
@@ -54,17 +196,25 @@ class ExchangeRatesStorage:
                 "to_currency": to_currency,
                 "rate": rate,
                 "timestamp": timestamp,
-                "source": source,
+                "source": pair_sources.get(pair_key, source),
                 "meta": {},
             }
-            history.append(record)
-            added_count += 1
+            new_records.append(record)
+            if is_latest:
+                last_timestamp[pair_key] = timestamp
 
-        save_json(self.history_file_path, history)
-        self.logger.info(f"Appended {added_count} rates to history")
+        self.history.append(new_records)
+        self._save_last_timestamps(last_timestamp)
+        self.logger.info(f"Appended {len(new_records)} rates to history")
 
     def _update_cache(
-        self, rates: dict[str, float], source: str, timestamp: str
+        self,
+        rates: dict[str, float],
+        source: str,
+        timestamp: str,
+        pair_sources: dict[str, str],
+        checked_sources: list[str] | None,
+        tables: dict[str, dict] | None = None,
     ) -> None:
         cache = load_json(self.rates_file_path, default=dict)
 
@@ -79,15 +229,48 @@ class ExchangeRatesStorage:
                 pairs[pair_key] = {
                     "rate": rate,
                     "updated_at": timestamp,
-                    "source": source,
+                    "source": pair_sources.get(pair_key, source),
                 }
                 updated_count += 1
 
         cache["pairs"] = pairs
         cache["last_refresh"] = timestamp
+        if tables:
+            cached_tables = cache.get("tables", {})
+            for name, table in tables.items():
+                cached_tables[name] = {**table, "updated_at": timestamp}
+            cache["tables"] = cached_tables
 
         save_json(self.rates_file_path, cache)
         self.logger.info(f"Updated cache with {updated_count} rates")
+        if checked_sources:
+            self._save_checked(checked_sources, timestamp)
+
+    def _save_checked(self, sources: list[str], timestamp: str) -> None:
+        checked = load_json(self.checked_file_path, default=dict)
+        for name in sources:
+            checked[name] = {"checked_at": timestamp}
+        save_json(self.checked_file_path, checked)
+
+    def mark_checked(self, sources: list[str], timestamp: str | None = None) -> None:
+        """Отмечает, что данные источников проверены и не изменились.
+
+        Записывает только время проверки в rates.checked.json, чтобы TTL
+        кэша отсчитывался от последней проверки. rates.json (в том числе
+        last_refresh) и история не перезаписываются.
+
+        Args:
+            sources (list[str]): Имена проверенных источников.
+            timestamp (str | None): Время проверки (ISO формат).
+        """
+        if not sources:
+            return
+        if timestamp is None:
+            ts = datetime.now(timezone.utc).isoformat()
+            timestamp = ts.replace("+00:00", "Z")
+
+        self._save_checked(sources, timestamp)
+        self.logger.info(f"Marked {', '.join(sources)} as checked at {timestamp}")
 
     def get_cached_rates(self) -> dict:
         """Возвращает актуальные курсы из кэша.
@@ -98,11 +281,23 @@ class ExchangeRatesStorage:
         cache = load_json(self.rates_file_path, default=dict)
         return cache.get("pairs", {})
 
+    def get_cached_tables(self) -> dict:
+        """Возвращает полные таблицы курсов из кэша.
+
+        Returns:
+            dict: Таблицы по имени источника.
+        """
+        cache = load_json(self.rates_file_path, default=dict)
+        return cache.get("tables", {})
+
     def get_history(
         self,
         from_currency: str | None = None,
         to_currency: str | None = None,
         limit: int | None = None,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+        oldest_first: bool = False,
     ) -> list[dict]:
         """Возвращает историю курсов с фильтрацией.
 
@@ -110,23 +305,68 @@ class ExchangeRatesStorage:
             from_currency (str | None): Фильтр по исходной валюте.
             to_currency (str | None): Фильтр по целевой валюте.
             limit (int | None): Максимальное количество записей.
+            since (str | datetime | None): Начало интервала (включительно).
+            until (str | datetime | None): Конец интервала (включительно).
+            oldest_first (bool): Вернуть записи от старых к новым; limit
+                тогда берет самые старые записи интервала.
 
         Returns:
-            list[dict]: Список записей истории (отсортированных по времени).
+            list[dict]: Список записей истории (по умолчанию от новых к
+                старым).
         """
-        history = load_json(self.history_file_path, default=list)
+        records = self.iter_history(
+            from_currency, to_currency, since, until, oldest_first
+        )
+        return list(islice(records, limit) if limit else records)
+
+    def iter_history(
+        self,
+        from_currency: str | None = None,
+        to_currency: str | None = None,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+        oldest_first: bool = False,
+    ) -> Iterator[dict]:
+        """Лениво перебирает историю курсов от новых записей к старым.
+
+        Записи читаются по индексу пар по мере перебора, поэтому вызывающий
+        код может остановиться после первых нужных записей.
 
-        filtered = history
+        Args:
+            from_currency (str | None): Фильтр по исходной валюте.
+            to_currency (str | None): Фильтр по целевой валюте.
+            since (str | datetime | None): Начало интервала (включительно).
+            until (str | datetime | None): Конец интервала (включительно).
+            oldest_first (bool): Перебирать от старых записей к новым.
 
-        if from_currency:
-            filtered = [r for r in filtered if r.get("from_currency") == from_currency]
+        Yields:
+            dict: Запись истории.
+        """
+        yield from self.history_index.iter_records(
+            from_currency, to_currency, since, until, oldest_first
+        )
 
-        if to_currency:
-            filtered = [r for r in filtered if r.get("to_currency") == to_currency]
+    def query_history(
+        self,
+        since: str | datetime | None = None,
+        until: str | datetime | None = None,
+        from_currency: str | None = None,
+        to_currency: str | None = None,
+    ) -> list[dict]:
+        """Возвращает записи истории за интервал времени от старых к новым.
 
-        filtered = sorted(filtered, key=lambda x: x.get("timestamp", ""), reverse=True)
+        То же, что get_history(..., oldest_first=True): записи находятся
+        по индексу пар, и читаются только записи из интервала.
 
-        if limit:
-            filtered = filtered[:limit]
+        Args:
+            since (str | datetime | None): Начало интервала (включительно).
+            until (str | datetime | None): Конец интервала (включительно).
+            from_currency (str | None): Фильтр по исходной валюте.
+            to_currency (str | None): Фильтр по целевой валюте.
 
-        return filtered
+        Returns:
+            list[dict]: Записи истории (от старых к новым).
+        """
+        return self.get_history(
+            from_currency, to_currency, since=since, until=until, oldest_first=True
+        )
@@ -1,63 +1,230 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone
 from typing import Sequence
 
-from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.core.exceptions import ApiRequestError, ProviderUnavailableError
 from valutatrade_hub.logging_config import get_logger
-from valutatrade_hub.parser_service.api_clients import BaseApiClient
+from valutatrade_hub.parser_service.api_clients import BaseApiClient, FetchResult
+from valutatrade_hub.parser_service.resilience import ResilientClient
 from valutatrade_hub.parser_service.storage import ExchangeRatesStorage
 
 
 class RatesUpdater:
-    """Координатор обновления курсов валют из различных источников."""
+    """Координатор обновления курсов валют из различных источников.
 
-    def __init__(self, clients: Sequence[BaseApiClient], storage: ExchangeRatesStorage):
-        self.clients = clients
+    Клиенты опрашиваются одновременно в пуле не более чем из max_workers
+    потоков, поэтому время обновления определяется самым медленным
+    источником, а не суммой всех. Если задан deadline, то по его
+    истечении сохраняются курсы уже ответивших источников, а остальные
+    считаются неуспешными.
+
+    Каждый клиент оборачивается в ResilientClient: временные ошибки
+    повторяются с задержкой, а источник с разомкнутым предохранителем
+    пропускается без запроса и попадает в skipped_sources.
+
+    Источники, данные которых не изменились (ответ 304 или время
+    следующего обновления еще не наступило), попадают в unchanged_sources;
+    их курсы не сохраняются повторно. Если новых курсов нет совсем, история
+    не меняется, а в кэше обновляется только время проверки этих
+    источников, чтобы TTL отсчитывался от нее.
+
+    Attributes:
+        clients (Sequence[BaseApiClient]): Клиенты источников курсов.
+        storage (ExchangeRatesStorage): Хранилище курсов.
+        max_workers (int): Максимальное число одновременных запросов.
+        deadline (float | None): Общий лимит времени на опрос, секунды.
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[BaseApiClient],
+        storage: ExchangeRatesStorage,
+        max_workers: int = 4,
+        deadline: float | None = None,
+    ):
+        self.clients = [ResilientClient.wrap(client) for client in clients]
         self.storage = storage
+        self.max_workers = max(1, int(max_workers))
+        self.deadline = deadline
         self.logger = get_logger()
 
+    def _fetch(self, client: ResilientClient) -> FetchResult:
+        self.logger.info(f"Fetching from {client.name}...")
+        return client.fetch_rates()
+
     def run_update(self) -> dict:
         """Запускает процесс обновления курсов из всех клиентов.
 
         Returns:
             dict: Результат обновления (total_rates, successful_sources,
-                failed_sources, timestamp).
+                failed_sources, skipped_sources, unchanged_sources,
+                timestamp). Пропущенные источники входят и в failed_sources.
         """
         self.logger.info("Starting rates update...")
 
+        if not self.clients:
+            futures = []
+        else:
+            executor = ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(self.clients)),
+                thread_name_prefix="rates-fetch",
+            )
+            futures = [executor.submit(self._fetch, client) for client in self.clients]
+            wait(futures, timeout=self.deadline)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        outcomes: list[FetchResult | BaseException] = []
+        for future in futures:
+            if not future.done():
+                outcomes.append(TimeoutError(f"no response within {self.deadline}s"))
+            elif future.exception() is not None:
+                outcomes.append(future.exception())
+            else:
+                outcomes.append(future.result())
+        return self._commit(outcomes)
+
+    async def run_update_async(self, provider_timeout: float | None = None) -> dict:
+        """Асинхронно обновляет курсы из всех клиентов в одном цикле событий.
+
+        Клиенты опрашиваются через fetch_rates_async одновременно; каждому
+        дается не более provider_timeout секунд, а весь опрос ограничен
+        deadline. Курсы ответивших клиентов сохраняются, даже если
+        остальные не успели.
+
+        Синхронные клиенты выполняются в собственном пуле потоков, который
+        закрывается без ожидания, как в run_update: иначе asyncio.run ждал
+        бы зависшие запросы в пуле цикла событий и deadline не соблюдался.
+
+        Args:
+            provider_timeout (float | None): Лимит времени на один источник,
+                секунды; по умолчанию равен deadline.
+
+        Returns:
+            dict: Результат обновления (как у run_update).
+        """
+        self.logger.info("Starting async rates update...")
+        timeout = provider_timeout if provider_timeout is not None else self.deadline
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_workers, len(self.clients))),
+            thread_name_prefix="rates-fetch",
+        )
+
+        async def fetch(client: ResilientClient) -> FetchResult:
+            self.logger.info(f"Fetching from {client.name}...")
+            try:
+                return await asyncio.wait_for(
+                    client.fetch_rates_async(executor), timeout
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"no response within {timeout}s")
+
+        tasks = [asyncio.ensure_future(fetch(client)) for client in self.clients]
+        try:
+            if tasks:
+                await asyncio.wait(tasks, timeout=self.deadline)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        outcomes: list[FetchResult | BaseException] = []
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+                outcomes.append(TimeoutError(f"no response within {self.deadline}s"))
+            elif task.exception() is not None:
+                outcomes.append(task.exception())
+            else:
+                outcomes.append(task.result())
+        return self._commit(outcomes)
+
+    def _commit(self, outcomes: list[FetchResult | BaseException]) -> dict:
+        """Сохраняет курсы успешно ответивших клиентов и собирает отчет.
+
+        Args:
+            outcomes (list[FetchResult | BaseException]): Результат опроса
+                или ошибка для каждого клиента в порядке self.clients.
+
+        Returns:
+            dict: Результат обновления.
+        """
         all_rates = {}
+        pair_sources = {}
         successful_sources = []
         failed_sources = []
+        skipped_sources = []
+        unchanged_sources = []
+        unchanged_names = []
+        tables = {}
+        cached_pairs = None
+        cached_tables = None
 
-        for client in self.clients:
-            client_name = client.__class__.__name__
-            try:
-                self.logger.info(f"Fetching from {client_name}...")
-                rates = client.fetch_rates()
-                all_rates.update(rates)
+        for client, outcome in zip(self.clients, outcomes):
+            client_name = client.name
+            if isinstance(outcome, ProviderUnavailableError):
+                failed_sources.append(client_name)
+                skipped_sources.append(client_name)
+                self.logger.warning(f"{client_name} skipped: {outcome.reason}")
+            elif isinstance(outcome, ApiRequestError):
+                failed_sources.append(client_name)
+                self.logger.error(f"{client_name} failed: {outcome.reason}")
+            elif isinstance(outcome, BaseException):
+                failed_sources.append(client_name)
+                self.logger.error(f"{client_name} failed: {str(outcome)}")
+            elif outcome.not_modified:
+                unchanged_sources.append(client_name)
+                unchanged_names.append(client.source_name)
+                successful_sources.append(client_name)
+                if cached_pairs is None:
+                    cached_pairs = self.storage.get_cached_rates()
+                missing = {
+                    k: v for k, v in outcome.rates.items() if k not in cached_pairs
+                }
+                if missing:
+                    all_rates.update(missing)
+                    pair_sources.update(dict.fromkeys(missing, client.source_name))
+                if outcome.table is not None:
+                    if cached_tables is None:
+                        cached_tables = self.storage.get_cached_tables()
+                    if client.source_name not in cached_tables:
+                        tables[client.source_name] = outcome.table
+                self.logger.info(f"{client_name} not modified")
+            else:
+                all_rates.update(outcome.rates)
+                pair_sources.update(dict.fromkeys(outcome.rates, client.source_name))
+                if outcome.table is not None:
+                    tables[client.source_name] = outcome.table
                 successful_sources.append(client_name)
                 self.logger.info(
-                    f"{client_name} fetched successfully ({len(rates)} rates)"
+                    f"{client_name} fetched successfully ({len(outcome.rates)} rates)"
                 )
-            except ApiRequestError as e:
-                failed_sources.append(client_name)
-                self.logger.error(f"{client_name} failed: {e.reason}")
-            except Exception as e:
-                failed_sources.append(client_name)
-                self.logger.error(f"{client_name} failed: {str(e)}")
 
-        if not all_rates:
-            self.logger.warning("No rates fetched from any source")
-            ts = datetime.now(timezone.utc).isoformat()
+        if not all_rates and not tables:
+            ts = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+            if unchanged_sources:
+                self.storage.mark_checked(unchanged_names, ts)
+                self.logger.info("Rates not modified, cache revalidated")
+            else:
+                self.logger.warning("No rates fetched from any source")
             return {
                 "total_rates": 0,
                 "successful_sources": successful_sources,
                 "failed_sources": failed_sources,
-                "timestamp": ts.replace("+00:00", "Z"),
+                "skipped_sources": skipped_sources,
+                "unchanged_sources": unchanged_sources,
+                "timestamp": ts,
             }
 
         timestamp = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
-        self.storage.save_rates(all_rates, source="ParserService", timestamp=timestamp)
+        self.storage.save_rates(
+            all_rates,
+            source="ParserService",
+            timestamp=timestamp,
+            pair_sources=pair_sources,
+            checked_sources=[client.source_name for client in self.clients],
+            tables=tables,
+        )
 
         self.logger.info(
             f"Update completed: {len(all_rates)} rates from "
@@ -68,5 +235,7 @@ class RatesUpdater:
             "total_rates": len(all_rates),
             "successful_sources": successful_sources,
             "failed_sources": failed_sources,
+            "skipped_sources": skipped_sources,
+            "unchanged_sources": unchanged_sources,
             "timestamp": timestamp,
         }